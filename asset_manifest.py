@@ -0,0 +1,295 @@
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+
+from build_manifest import sha256_file, write_json_atomic
+
+# ==========================================
+# Configurazione
+# ==========================================
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.path.join(ROOT_DIR, 'assets.json')
+STAT_CACHE_PATH = os.path.join(ROOT_DIR, '.cache', 'assets-stat.json')
+MANIFEST_VERSION = 1
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.svg')
+# Ordine di preferenza della variante principale di un logo
+FORMAT_PREFERENCE = ('png', 'webp', 'jpeg', 'gif', 'avif', 'svg')
+# Cartelle delle copertine generate: namespace della chiave -> cartella (sottocartelle = preset)
+COVER_SETS = {'cover': 'generated-covers', 'cover-world': 'generated-covers-world'}
+COVER_PRESETS = ('portrait', 'landscape')
+DERIVATIVES_DIR = 'derivatives'
+
+SVG_SIZE_RE = re.compile(rb'<svg\b[^>]*>', re.IGNORECASE | re.DOTALL)
+DERIVATIVE_VARIANT_RE = re.compile(r'^[a-z]+-\d+$')
+
+
+def normalise_key(key):
+    """'Logo/UEFA Champions League' -> 'logo/uefa-champions-league' (ogni segmento separatamente)."""
+    segments = []
+    for segment in key.split('/'):
+        text = unicodedata.normalize('NFKD', segment).encode('ascii', 'ignore').decode('ascii').lower()
+        segments.append(re.sub(r'[^a-z0-9]+', '-', text).strip('-'))
+    return '/'.join(segments)
+
+# ==========================================
+# Lettura degli asset
+# ==========================================
+
+def _svg_size(path):
+    # Solo l'intestazione <svg ...>: width/height se numerici, altrimenti il viewBox
+    with open(path, 'rb') as f:
+        match = SVG_SIZE_RE.search(f.read(8192))
+    if not match:
+        return None, None
+    tag = match.group(0).decode('utf-8', 'replace')
+    attrs = dict(re.findall(r'([\w:-]+)\s*=\s*["\']([^"\']*)["\']', tag))
+    try:
+        return round(float(attrs['width'].rstrip('px'))), round(float(attrs['height'].rstrip('px')))
+    except (KeyError, ValueError):
+        pass
+    box = attrs.get('viewBox', '').replace(',', ' ').split()
+    if len(box) == 4:
+        try:
+            return round(float(box[2])), round(float(box[3]))
+        except ValueError:
+            pass
+    return None, None
+
+
+def probe(path):
+    """Formato e dimensioni dal solo header del file (Pillow non decodifica i pixel)."""
+    if path.lower().endswith('.svg'):
+        width, height = _svg_size(path)
+        return {'format': 'svg', 'width': width, 'height': height}
+    from PIL import Image
+    with Image.open(path) as img:
+        return {'format': img.format.lower(), 'width': img.width, 'height': img.height}
+
+
+def iter_assets(root=ROOT_DIR):
+    """Genera (chiave, variante, percorso relativo) per ogni asset del repository."""
+    from matchup import LEAGUES, find_team_files, preset_output
+
+    for name in sorted(os.listdir(root)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in IMAGE_EXTS and os.path.isfile(os.path.join(root, name)):
+            yield f"logo/{stem}", ext.lower().lstrip('.').replace('jpg', 'jpeg'), name
+
+    # Versioni ridotte dei loghi (derivatives.py): varianti 'webp-64', 'png-128', ...
+    derivatives = os.path.join(root, DERIVATIVES_DIR)
+    if os.path.isdir(derivatives):
+        for stem in sorted(os.listdir(derivatives)):
+            folder = os.path.join(derivatives, stem)
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                width, ext = os.path.splitext(name)
+                if ext.lower() in IMAGE_EXTS and width.isdigit():
+                    yield f"logo/{stem}", f"{ext.lstrip('.')}-{width}", f"{DERIVATIVES_DIR}/{stem}/{name}"
+
+    for league, conf in LEAGUES.items():
+        directory = conf['directory']
+        if not os.path.isdir(os.path.join(root, directory)):
+            continue
+        teams = find_team_files(os.path.join(root, directory), {'image.png', conf['center_logo']})
+        for team in teams:
+            stem, ext = os.path.splitext(team)
+            yield f"{league}/{stem}", ext.lstrip('.'), f"{directory}/{team}"
+        for preset in conf['presets']:
+            folder = os.path.join(root, directory, preset.get('subdir', ''))
+            if not os.path.isdir(folder):
+                continue
+            ext = os.path.splitext(preset_output(preset, 'x'))[1]
+            for name in sorted(os.listdir(folder)):
+                if '_vs_' in name and name.endswith(ext):
+                    rel = preset_output(preset, name)
+                    yield f"{league}-matchup/{os.path.splitext(name)[0]}", preset['name'], f"{directory}/{rel}"
+
+    for namespace, directory in COVER_SETS.items():
+        for preset in COVER_PRESETS:
+            folder = os.path.join(root, directory, preset)
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTS:
+                    yield f"{namespace}/{os.path.splitext(name)[0]}", preset, f"{directory}/{preset}/{name}"
+
+# ==========================================
+# Costruzione incrementale
+# ==========================================
+
+class AssetScanner:
+    """Dettagli dei file (hash, formato, dimensioni) ricalcolati solo se cambiano dimensione/mtime o contenuto."""
+
+    def __init__(self, root=ROOT_DIR, stat_cache_path=STAT_CACHE_PATH, previous=None):
+        self.root = root
+        self.stat_cache_path = stat_cache_path
+        self.stat_cache = {}
+        if stat_cache_path and os.path.exists(stat_cache_path):
+            with open(stat_cache_path, 'r', encoding='utf-8') as f:
+                self.stat_cache = json.load(f)
+        # Dal manifest precedente: sha256 -> dettagli, per non rileggere l'header dei file solo "toccati"
+        self.known = {}
+        for entry in (previous or {}).get('assets', {}).values():
+            for details in entry['variants'].values():
+                self.known[details['sha256']] = details
+        self.seen = {}
+        self.hashed = 0
+        self.probed = 0
+
+    def details(self, rel):
+        path = os.path.join(self.root, rel)
+        st = os.stat(path)
+        cached = self.stat_cache.get(rel)
+        if cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns:
+            entry = cached
+        else:
+            digest = sha256_file(path)
+            self.hashed += 1
+            known = self.known.get(digest)
+            if known is None:
+                known = probe(path)
+                self.probed += 1
+            entry = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest,
+                     'format': known['format'], 'width': known['width'], 'height': known['height']}
+        self.seen[rel] = entry
+        return {'path': rel, 'format': entry['format'], 'width': entry['width'], 'height': entry['height'],
+                'bytes': entry['size'], 'sha256': entry['sha256']}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.stat_cache_path), exist_ok=True)
+        write_json_atomic(self.stat_cache_path, self.seen)
+
+
+def _primary(variants):
+    # Le versioni ridotte ('webp-64', ...) non sono mai la variante principale se c'è l'originale
+    def rank(item):
+        name, details = item
+        fmt = details['format']
+        return (bool(DERIVATIVE_VARIANT_RE.match(name)),
+                FORMAT_PREFERENCE.index(fmt) if fmt in FORMAT_PREFERENCE else len(FORMAT_PREFERENCE), name)
+    return min(variants.items(), key=rank)[0]
+
+
+def build(root=ROOT_DIR, previous=None, stat_cache_path=STAT_CACHE_PATH):
+    """Manifest completo: chiave normalizzata -> dettagli della variante principale e di tutte le varianti."""
+    scanner = AssetScanner(root, stat_cache_path, previous)
+    grouped, collisions = {}, []
+    for key, variant, rel in iter_assets(root):
+        variants = grouped.setdefault(normalise_key(key), {})
+        if variant in variants:
+            collisions.append(rel)
+            continue
+        variants[variant] = scanner.details(rel)
+
+    assets = {}
+    for key in sorted(grouped):
+        variants = dict(sorted(grouped[key].items()))
+        primary = _primary(variants)
+        assets[key] = {**variants[primary], 'variant': primary, 'variants': variants}
+    if stat_cache_path:
+        scanner.save()
+    return {'version': MANIFEST_VERSION, 'assets': assets}, scanner, collisions
+
+
+def dumps(manifest):
+    """Un asset per riga: file compatto ma con diff leggibili quando cambia un solo logo."""
+    lines = [f"{json.dumps(key)}: {json.dumps(entry, separators=(',', ':'))}" for key, entry in manifest['assets'].items()]
+    return f'{{"version": {manifest["version"]}, "assets": {{\n' + ',\n'.join(lines) + '\n}}\n'
+
+
+def update(path=MANIFEST_PATH, root=ROOT_DIR, stat_cache_path=STAT_CACHE_PATH):
+    """Aggiorna il manifest su disco; lo riscrive solo se il contenuto è cambiato."""
+    previous = None
+    old_text = None
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            old_text = f.read()
+        try:
+            previous = json.loads(old_text)
+        except json.JSONDecodeError:
+            previous = None
+    manifest, scanner, collisions = build(root, previous, stat_cache_path)
+    text = dumps(manifest)
+    changed = text != old_text
+    if changed:
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(f"{path}.tmp", path)
+    return manifest, scanner, collisions, changed
+
+# ==========================================
+# Lettura (API per chi usa i loghi)
+# ==========================================
+
+class AssetIndex:
+    """Indice degli asset caricato da assets.json: ricerche per chiave in O(1), senza toccare il filesystem."""
+
+    def __init__(self, manifest, root=ROOT_DIR):
+        self.assets = manifest['assets']
+        self.root = root
+
+    @classmethod
+    def load(cls, path=MANIFEST_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), os.path.dirname(os.path.abspath(path)))
+
+    def __contains__(self, key):
+        return normalise_key(key) in self.assets
+
+    def __len__(self):
+        return len(self.assets)
+
+    def get(self, key, variant=None):
+        """Dettagli dell'asset (variante principale o quella richiesta, es. 'svg', 'landscape'), o None."""
+        entry = self.assets.get(normalise_key(key))
+        if entry is None or variant is None:
+            return entry
+        return entry['variants'].get(variant)
+
+    def path(self, key, variant=None, absolute=False):
+        """Percorso relativo al repository (o assoluto) dell'asset, o None se non esiste."""
+        details = self.get(key, variant)
+        if details is None:
+            return None
+        return os.path.join(self.root, details['path']) if absolute else details['path']
+
+    def variants(self, key):
+        entry = self.assets.get(normalise_key(key))
+        return list(entry['variants']) if entry else []
+
+    def keys(self, namespace=None):
+        """Chiavi normalizzate, tutte o solo quelle di un namespace (es. 'seriea-matchup')."""
+        if namespace is None:
+            return list(self.assets)
+        prefix = f"{normalise_key(namespace)}/"
+        return [key for key in self.assets if key.startswith(prefix)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera/aggiorna assets.json, il manifest di tutti i loghi del repository.")
+    parser.add_argument('--output', default=MANIFEST_PATH)
+    parser.add_argument('--check', action='store_true', help="esce con codice 1 se il manifest non è aggiornato")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        with open(args.output, 'r', encoding='utf-8') as f:
+            old_text = f.read()
+        manifest, scanner, collisions = build(previous=json.loads(old_text))
+        changed = dumps(manifest) != old_text
+    else:
+        manifest, scanner, collisions, changed = update(args.output)
+    for rel in collisions:
+        print(f"AVVISO: chiave già usata, ignorato {rel}")
+    print(f"{len(manifest['assets'])} asset, {len(scanner.seen)} file ({scanner.hashed} ricalcolati, "
+          f"{scanner.probed} header letti): {'aggiornato' if changed else 'invariato'}")
+    if args.check and changed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import sys
+from PIL import Image
+
+from build_manifest import sha256_file, write_json_atomic
+from matchup import (LEAGUES, TileCache, find_team_files, league_directory, matchup_name, preset_output,
+                     pyramids, tile_size)
+
+# ==========================================
+# Configurazione
+# ==========================================
+ATLAS_DIR = 'atlas'
+INDEX_NAME = 'index.json'
+MAX_SHEET_SIZE = 4096
+ATLAS_VERSION = 2  # 2: 'teams' con il nome del file sorgente di ogni squadra
+
+# ==========================================
+# Impacchettamento
+# ==========================================
+
+def pack_shelves(sizes, max_size=MAX_SHEET_SIZE):
+    """Impacchetta rettangoli (nome -> (w, h)) in fogli a ripiani; restituisce nome -> (foglio, x, y) e le dimensioni dei fogli."""
+    placements = {}
+    sheets = []
+    sheet, x, y, shelf_h, used_w = 0, 0, 0, 0, 0
+    # I più alti per primi: ripiani più compatti
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0], item[0])):
+        if w > max_size or h > max_size:
+            raise ValueError(f"{name}: {w}x{h} non entra in un foglio {max_size}x{max_size}")
+        if x + w > max_size:
+            x, y, shelf_h = 0, y + shelf_h, 0
+        if y + h > max_size:
+            sheets.append((used_w, y))
+            sheet, x, y, shelf_h, used_w = sheet + 1, 0, 0, 0, 0
+        placements[name] = (sheet, x, y)
+        x += w
+        shelf_h = max(shelf_h, h)
+        used_w = max(used_w, x)
+    if placements:
+        sheets.append((used_w, y + shelf_h))
+    return placements, sheets
+
+
+def build_atlas(league, include_matchups=False, max_size=MAX_SHEET_SIZE):
+    """Scrive i fogli e l'indice dell'atlas del campionato in <cartella>/atlas/."""
+    conf = LEAGUES[league]
+    directory = league_directory(conf)
+    presets = conf['presets']
+    center_logo = conf['center_logo']
+    team_files = find_team_files(directory, {'image.png', os.path.basename(center_logo)})
+    tile_pyramid, center_pyramid = pyramids(presets)
+
+    cache = TileCache()
+    images = {}
+    for preset in presets:
+        size = (preset['center_size'], preset['center_size'])
+        images[f"center/{preset['name']}"] = cache.get(os.path.join(directory, center_logo), size,
+                                                       premultiply=False, pyramid=center_pyramid)
+        for team in team_files:
+            team_name = os.path.splitext(team)[0]
+            images[f"tile/{preset['name']}/{team_name}"] = cache.get(os.path.join(directory, team), tile_size(preset),
+                                                                     premultiply=False, pyramid=tile_pyramid)
+        if include_matchups:
+            for team1 in team_files:
+                for team2 in team_files:
+                    output = preset_output(preset, matchup_name(team1, team2))
+                    path = os.path.join(directory, output)
+                    if team1 != team2 and os.path.exists(path):
+                        with Image.open(path) as img:
+                            images[f"matchup/{preset['name']}/{os.path.splitext(os.path.basename(output))[0]}"] = img.convert('RGBA')
+
+    placements, sheet_sizes = pack_shelves({name: img.size for name, img in images.items()}, max_size)
+    atlas_dir = os.path.join(directory, ATLAS_DIR)
+    os.makedirs(atlas_dir, exist_ok=True)
+    sheets = [Image.new('RGBA', size) for size in sheet_sizes]
+    for name, (sheet, x, y) in placements.items():
+        sheets[sheet].paste(images[name], (x, y))
+
+    sheet_names = []
+    for i, sheet in enumerate(sheets):
+        sheet_name = f"sheet-{i}.png"
+        sheet.save(os.path.join(atlas_dir, sheet_name))
+        sheet_names.append(sheet_name)
+    for stale in os.listdir(atlas_dir):
+        if stale.startswith('sheet-') and stale not in sheet_names:
+            os.remove(os.path.join(atlas_dir, stale))
+
+    index = {
+        'version': ATLAS_VERSION,
+        'league': league,
+        'center_logo': center_logo,
+        'sheets': sheet_names,
+        'sources': {f: sha256_file(os.path.join(directory, f)) for f in [center_logo] + team_files},
+        # Nome della voce -> file sorgente (anche .svg): è la chiave con cui il renderer cerca il tile
+        'teams': {os.path.splitext(f)[0]: f for f in team_files},
+        'entries': {name: [sheet, x, y, *images[name].size] for name, (sheet, x, y) in sorted(placements.items())},
+    }
+    write_json_atomic(os.path.join(atlas_dir, INDEX_NAME), index, indent=1)
+    print(f"Atlas {league}: {len(images)} immagini in {len(sheets)} fogli ({cache.report()})")
+    return index
+
+# ==========================================
+# Lettura
+# ==========================================
+
+class Atlas:
+    """Indice dell'atlas di un campionato; i fogli vengono decodificati una volta sola, alla prima richiesta."""
+
+    def __init__(self, atlas_dir, index):
+        self.atlas_dir = atlas_dir
+        self.index = index
+        self.entries = index['entries']
+        self._sheets = {}
+
+    @classmethod
+    def load(cls, directory):
+        atlas_dir = os.path.join(directory, ATLAS_DIR)
+        with open(os.path.join(atlas_dir, INDEX_NAME), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != ATLAS_VERSION:
+            raise ValueError(f"Versione dell'atlas non supportata in {atlas_dir}")
+        return cls(atlas_dir, index)
+
+    def _sheet(self, i):
+        if i not in self._sheets:
+            with Image.open(os.path.join(self.atlas_dir, self.index['sheets'][i])) as img:
+                self._sheets[i] = img.convert('RGBA')
+        return self._sheets[i]
+
+    def image(self, name):
+        sheet, x, y, w, h = self.entries[name]
+        return self._sheet(sheet).crop((x, y, x + w, y + h))
+
+    def team_hashes(self):
+        center = self.index['center_logo']
+        return {f: digest for f, digest in self.index['sources'].items() if f != center}
+
+    def center_hash(self):
+        return self.index['sources'][self.index['center_logo']]
+
+    def seed_cache(self, cache, directory):
+        """Carica nella TileCache tutti i tile dell'atlas, così il compositing non apre i singoli loghi."""
+        center, tiles = {}, {}
+        for name in self.entries:
+            kind, _, rest = name.partition('/')
+            if kind == 'center':
+                img = self.image(name)
+                center[img.size] = img
+            elif kind == 'tile':
+                team = rest.partition('/')[2]
+                img = self.image(name)
+                tiles.setdefault(team, {})[img.size] = img
+        cache.seed(os.path.join(directory, self.index['center_logo']), center)
+        for team, levels in tiles.items():
+            cache.seed(os.path.join(directory, self.index['teams'][team]), levels)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Impacchetta i loghi (e i matchup) di ogni campionato in fogli atlas.")
+    parser.add_argument('leagues', nargs='*', metavar='league',
+                        help=f"campionati (default tutti: {', '.join(LEAGUES)})")
+    parser.add_argument('--matchups', action='store_true', help="includi anche i matchup già generati")
+    parser.add_argument('--max-size', type=int, default=MAX_SHEET_SIZE, help="lato massimo di un foglio (px)")
+    args = parser.parse_args(argv)
+    for league in args.leagues or list(LEAGUES):
+        build_atlas(league, include_matchups=args.matchups, max_size=args.max_size)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import PIL
+from PIL import Image, ImageDraw
+
+# ==========================================
+# Configurazione
+# ==========================================
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNTHETIC_TEAMS = 60
+SYNTHETIC_SOURCE_SIZE = 512
+SYNTHETIC_SEED = 1234
+# Fasi misurate da render_league (contatori matchup.<fase>Seconds, sommati anche dai worker), più
+# la pianificazione e il rendering complessivo (fasi instrument)
+STAGES = ('decode', 'resize', 'composite', 'encode', 'write')
+TOTALS = ('plan', 'render')
+
+
+def make_synthetic_set(directory, n=SYNTHETIC_TEAMS, size=SYNTHETIC_SOURCE_SIZE, seed=SYNTHETIC_SEED):
+    """Crea n stemmi sintetici (forme colorate su fondo trasparente) e un logo centrale."""
+    rng = random.Random(seed)
+    for i in range(n + 1):
+        img = Image.new('RGBA', (size, size))
+        draw = ImageDraw.Draw(img)
+        color = tuple(rng.randrange(256) for _ in range(3)) + (255,)
+        draw.ellipse((8, 8, size - 8, size - 8), fill=color)
+        for _ in range(6):
+            x0, y0 = rng.randrange(size // 2), rng.randrange(size // 2)
+            x1, y1 = x0 + rng.randrange(32, size // 2), y0 + rng.randrange(32, size // 2)
+            draw.rectangle((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)) + (rng.randrange(128, 256),))
+        name = 'center.png' if i == n else f"team{i:02d}.png"
+        img.save(os.path.join(directory, name))
+    return 'center.png'
+
+
+def copy_league(conf, directory, max_teams=None):
+    """Copia loghi squadra e logo centrale di un campionato (niente matchup, manifest o atlas già presenti)."""
+    from matchup import find_team_files, league_directory
+
+    source = league_directory(conf)
+    teams = find_team_files(source, {'image.png', os.path.basename(conf['center_logo'])})[:max_teams]
+    os.makedirs(directory)
+    for f in teams + [conf['center_logo']]:
+        shutil.copy2(os.path.join(source, f), os.path.join(directory, f))
+
+# ==========================================
+# Misura (un processo per insieme)
+# ==========================================
+
+def measure(directory, center_logo, league, encoder=None, jobs=1, batch=False):
+    """Eseguito in un processo separato: genera tutti i matchup con render_league, come matchup.py.
+
+    Ogni insieme parte da una cartella senza manifest (tutti i matchup da generare) e il picco di memoria
+    non dipende dagli insiemi misurati prima.
+    """
+    import instrument
+    from instrument import peak_rss_kb
+    from matchup import LEAGUES, render_league
+
+    presets = LEAGUES[league]['presets']
+    if encoder:
+        presets = [dict(p, encoder=encoder) for p in presets]
+    base_rss = peak_rss_kb()
+    report_dir = os.path.join(directory, '.report')
+    start = time.perf_counter()
+    with instrument.run('bench', report_dir=report_dir):
+        rendered = render_league(directory, center_logo, presets, jobs=jobs, batch=batch)
+    wall = time.perf_counter() - start
+    with open(os.path.join(report_dir, 'bench.json'), 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    counters = report['counters']
+    seconds = {name: stage['seconds'] for name, stage in report['stages'].items()}
+    for stage in STAGES:
+        seconds[stage] = round(counters.get(f"matchup.{stage}Seconds", 0.0), 6)
+    peak = peak_rss_kb()
+    return {
+        'matchups': rendered,
+        'encoder': encoder,
+        'jobs': jobs,
+        'batch': batch,
+        'seconds': seconds,
+        'wall_seconds': round(wall, 6),
+        'images_per_second': round(rendered / wall, 3) if wall else None,
+        'output_bytes': counters.get('matchup.bytesWritten', 0),
+        'tile_decodes': counters.get('tiles.decodes'),
+        'tile_resizes': counters.get('tiles.resizes'),
+        'peak_rss_kb': peak,
+        'peak_rss_delta_kb': peak - base_rss if peak is not None else None,
+    }
+
+
+def run_measure(directory, center_logo, league, encoder, jobs, batch):
+    cmd = [sys.executable, os.path.abspath(__file__), '--measure', directory, center_logo, league, '--jobs', str(jobs)]
+    if encoder:
+        cmd += ['--encoder', encoder]
+    if batch:
+        cmd.append('--batch')
+    proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def run(encoder=None, max_teams=None, synthetic_teams=SYNTHETIC_TEAMS, jobs=1, batch=False):
+    from matchup import LEAGUES
+
+    results = {
+        'generatedAt': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'platform': platform.platform(),
+        'sets': {},
+    }
+    with tempfile.TemporaryDirectory(prefix='bench_matchups_') as tmp:
+        sets = []
+        for league, conf in LEAGUES.items():
+            directory = os.path.join(tmp, league)
+            copy_league(conf, directory, max_teams)
+            sets.append((league, directory, conf['center_logo'], league))
+        synthetic_dir = os.path.join(tmp, 'synthetic')
+        os.makedirs(synthetic_dir)
+        center = make_synthetic_set(synthetic_dir, synthetic_teams)
+        # Stemmi sintetici con i preset di Serie A
+        sets.append((f"synthetic{synthetic_teams}", synthetic_dir, center, 'seriea'))
+
+        for name, directory, center_logo, league in sets:
+            print(f"[BENCH] {name}...")
+            teams = len([f for f in os.listdir(directory) if f != center_logo])
+            r = run_measure(directory, center_logo, league, encoder, jobs, batch)
+            results['sets'][name] = dict(r, teams=teams)
+    return results
+
+
+def print_results(results, baseline=None):
+    for name, r in results['sets'].items():
+        print(f"{name}: {r['teams']} squadre, {r['matchups']} matchup, {r['images_per_second']} img/s, "
+              f"{r['output_bytes'] / 1024:.0f} KB, {r['tile_decodes']} decodifiche, "
+              f"picco RSS {r['peak_rss_kb']} KB (+{r['peak_rss_delta_kb']} KB)")
+        base = (baseline or {}).get('sets', {}).get(name)
+        for stage in STAGES + TOTALS + ('wall',):
+            value = r['wall_seconds'] if stage == 'wall' else r['seconds'].get(stage, 0.0)
+            line = f"  {stage:<10} {value:>9.3f}s"
+            if base:
+                old = base['wall_seconds'] if stage == 'wall' else base['seconds'].get(stage, 0.0)
+                delta = f"{100 * (value - old) / old:+.1f}%" if old else "n/a"
+                line += f"  (prima {old:.3f}s, {delta})"
+            print(line)
+
+
+def main(argv=None):
+    from encoders import alpha_tiers
+
+    parser = argparse.ArgumentParser(description="Benchmark di render_league (lo stesso percorso di matchup.py) su copie "
+                                                 "dei campionati e su un insieme sintetico.")
+    parser.add_argument('--encoder', choices=alpha_tiers(), help="livello di codifica per tutti i preset")
+    parser.add_argument('--teams', type=int, default=None,
+                        help="massimo numero di squadre per campionato (i matchup sono n*(n-1))")
+    parser.add_argument('--synthetic-teams', type=int, default=SYNTHETIC_TEAMS)
+    parser.add_argument('--jobs', type=int, default=1, help="processi di render_league (come matchup.py --jobs)")
+    parser.add_argument('--batch', action='store_true', help="compositing per riga con compose_row (numpy)")
+    parser.add_argument('--output', help="file JSON dove salvare i risultati")
+    parser.add_argument('--compare', help="JSON di un'esecuzione precedente da confrontare")
+    parser.add_argument('--measure', nargs=3, metavar=('DIR', 'CENTER', 'LEAGUE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        result = measure(*args.measure, encoder=args.encoder, jobs=args.jobs, batch=args.batch)
+        print(json.dumps(result))
+        return
+
+    results = run(args.encoder, args.teams, args.synthetic_teams, args.jobs, args.batch)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Risultati salvati in {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
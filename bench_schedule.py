@@ -0,0 +1,168 @@
+import argparse
+import html
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from instrument import peak_rss_kb
+from schedule_parser import ENGINES
+
+# ==========================================
+# Configurazione
+# ==========================================
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEDULE_JSON = os.path.join(ROOT_DIR, 'daddyliveSchedule.json')
+REPEAT = 5
+
+# ==========================================
+# Fixture sintetiche (dai dati reali di daddyliveSchedule.json)
+# ==========================================
+# Le pagine della programmazione non sono salvate nel repository: si ricostruiscono i due layout dal JSON,
+# con il rumore tipico delle pagine vere (script pubblicitari, commenti, entità, span annidati).
+
+NOISE = ('<script type="text/javascript">window.ads = window.ads || []; ads.push({zone: "x"});</script>'
+         '<!-- banner --><div class="ad-slot"><iframe src="about:blank"></iframe></div>')
+
+
+def _esc(text):
+    return html.escape(text, quote=False)
+
+
+def table_page(schedule, repeat=1):
+    rows = []
+    for n in range(repeat):
+        for day, categories in schedule.items():
+            rows.append(f'<tr class="date-row"><td colspan="2"><strong> {_esc(day)}{" " * n}</strong></td></tr>')
+            for category, events in categories.items():
+                rows.append(f'<tr class="category-row"><td><span><strong>{_esc(category)}</strong></span></td></tr>')
+                for event in events:
+                    rows.append('<tr class="event-row"><td><div class="event-time"><strong>'
+                                f'{_esc(event["time"])}</strong></div></td><td><div class="event-info">\n  '
+                                f'{_esc(event["event"])} <!-- id --></div></td></tr>')
+                    links = ''.join(f'<a class="channel-button-small" href="/stream/stream-{c["channel_id"]}.php">'
+                                    f'{_esc(c["channel_name"])} (CH-{c["channel_id"]})</a>\n'
+                                    for c in event['channels'])
+                    rows.append(f'<tr class="channel-row"><td colspan="2">{links}</td></tr>')
+    return (f'<!DOCTYPE html><html><head><title>Schedule</title>{NOISE * 20}</head><body>{NOISE}'
+            f'<div id="main-schedule-container"><table class="schedule-table"><tbody>{"".join(rows)}'
+            '</tbody></table></div></body></html>')
+
+
+def div_page(schedule, repeat=1):
+    days = []
+    for n in range(repeat):
+        for day, categories in schedule.items():
+            cats = []
+            for category, events in categories.items():
+                evs = []
+                for event in events:
+                    links = ''.join(f'<a href="/watch.php?id={c["channel_id"]}" target="_blank" class="ch">'
+                                    f'<span>{_esc(c["channel_name"])}</span> CH-{c["channel_id"]}</a>'
+                                    for c in event['channels'])
+                    evs.append(f'<div class="schedule__event"><div class="schedule__eventHeader">'
+                               f'<span class="schedule__time" data-time="x">{_esc(event["time"])}</span>'
+                               f'<span class="schedule__eventTitle">{_esc(event["event"])}</span></div>'
+                               f'<div class="schedule__channels">{links}<script>track()</script></div></div>')
+                cats.append(f'<div class="schedule__category"><div class="schedule__catHeader"><div class="card__meta">'
+                            f'{_esc(category)}</div></div><div class="schedule__categoryBody">{"".join(evs)}</div></div>')
+            days.append(f'<div class="schedule__day"><div class="schedule__dayTitle">{_esc(day)}{" #" * n}</div>'
+                        f'{"".join(cats)}</div>')
+    return (f'<!DOCTYPE html><html><head><title>Schedule</title>{NOISE * 20}</head><body>{NOISE}'
+            f'<div id="schedule" class="schedule schedule--compact">{"".join(days)}</div>{NOISE}</body></html>')
+
+
+def write_fixtures(directory, repeat):
+    with open(SCHEDULE_JSON, 'r', encoding='utf-8') as f:
+        schedule = json.load(f)
+    fixtures = []
+    for layout, build in (('table', table_page), ('div', div_page)):
+        path = os.path.join(directory, f"schedule-{layout}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(build(schedule, repeat))
+        fixtures.append((path, layout))
+    return fixtures
+
+# ==========================================
+# Misura
+# ==========================================
+
+def measure(engine, layout, path, repeat=REPEAT):
+    """Eseguito in un processo separato: il picco di memoria non dipende dagli altri motori."""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    parse = ENGINES[engine][layout]
+    parse('<html></html>')  # import e compilazione fuori dalla misura
+    base_rss = peak_rss_kb()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse(content)
+        times.append(time.perf_counter() - start)
+    peak = peak_rss_kb()
+    output = json.dumps(result, indent=4)
+    return {
+        'engine': engine,
+        'layout': layout,
+        'best_seconds': min(times),
+        'median_seconds': sorted(times)[len(times) // 2],
+        'peak_rss_delta_kb': peak - base_rss if peak is not None else None,
+        'events': sum(len(events) for day in result.values() for events in day.values()),
+        'output': output,
+    }
+
+
+def run_measure(engine, layout, path, repeat):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', engine, layout, path,
+                           '--repeat', str(repeat)], capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline dei motori di parsing della programmazione.")
+    parser.add_argument('fixtures', nargs='*', help="pagine HTML salvate da aggiungere alle fixture sintetiche, nella forma FILE oppure FILE:layout")
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--scale', type=int, default=4, help="ripetizioni dei giorni nelle fixture sintetiche")
+    parser.add_argument('--output', help="salva i risultati in questo file JSON")
+    parser.add_argument('--measure', nargs=3, metavar=('ENGINE', 'LAYOUT', 'FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure, repeat=args.repeat)))
+        return
+
+    results = []
+    identical = True
+    with tempfile.TemporaryDirectory(prefix='bench_schedule_') as tmp:
+        fixtures = write_fixtures(tmp, args.scale)
+        # Di default solo le fixture sintetiche: 247.html è la pagina dei canali, non la programmazione (0 eventi)
+        for spec in args.fixtures:
+            path, _, layout = spec.partition(':')
+            fixtures += [(path, layout)] if layout else [(path, 'table'), (path, 'div')]
+
+        for path, layout in fixtures:
+            size = os.path.getsize(path)
+            outputs = {}
+            for engine in ENGINES:
+                r = run_measure(engine, layout, path, args.repeat)
+                outputs[engine] = r.pop('output')
+                results.append(dict(r, fixture=os.path.basename(path), bytes=size))
+                print(f"{os.path.basename(path):<22} {layout:<5} {engine:<4} {r['best_seconds'] * 1000:>9.1f} ms "
+                      f"(mediana {r['median_seconds'] * 1000:.1f} ms), +{r['peak_rss_delta_kb']} KB RSS, "
+                      f"{r['events']} eventi")
+            same = len(set(outputs.values())) == 1
+            identical &= same
+            print(f"  JSON identico tra i motori: {'sì' if same else 'NO'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Risultati salvati in {args.output}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
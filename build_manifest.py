@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def sha256_file(path, chunk_size=1 << 16):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def params_key(*parts):
+    """Chiave stabile di una build: hash di parametri e hash degli input (in ordine)."""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """Scrive il JSON su un file temporaneo e lo rinomina: chi legge non vede mai un file a metà."""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **dump_kwargs)
+    os.replace(tmp, path)
+
+
+class BuildManifest:
+    """Manifest di build: hash dei file sorgente (ricalcolati solo se cambia mtime/size), chiavi degli output
+    e hash dei pixel di ogni output (per non riscrivere un file con gli stessi pixel, vedi encoders.write_if_changed).
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.inputs = {}
+        self.outputs = {}
+        self.pixels = {}
+        self.existed = False
+        self.hashed = 0
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.inputs = data.get('inputs', {})
+                self.outputs = data.get('outputs', {})
+                self.pixels = data.get('pixels', {})
+                self.existed = True
+        self._seen_inputs = set()
+
+    def file_hash(self, path, name=None):
+        name = name or os.path.basename(path)
+        st = os.stat(path)
+        entry = self.inputs.get(name)
+        self._seen_inputs.add(name)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return entry['sha256']
+        digest = sha256_file(path)
+        self.hashed += 1
+        self.inputs[name] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    def known_hash(self, name, digest):
+        """Hash di un input fornito da altri (es. l'indice dell'atlas) senza leggere il file.
+
+        L'input conta come visto: la voce con stat e hash in cache resta nel manifest se l'hash coincide,
+        altrimenti viene tolta (alla prossima lettura il file verrà ricalcolato).
+        """
+        self._seen_inputs.add(name)
+        entry = self.inputs.get(name)
+        if entry and entry['sha256'] != digest:
+            del self.inputs[name]
+        return digest
+
+    def is_fresh(self, name, key, path=None):
+        if self.outputs.get(name) != key:
+            return False
+        return path is None or os.path.exists(path)
+
+    def record(self, name, key, pixels=None):
+        self.outputs[name] = key
+        if pixels:
+            self.pixels[name] = pixels
+
+    def forget(self, name):
+        self.outputs.pop(name, None)
+        self.pixels.pop(name, None)
+
+    def save(self):
+        # Tiene solo gli input visti in questa esecuzione (i file rimossi spariscono dal manifest)
+        inputs = {k: v for k, v in self.inputs.items() if k in self._seen_inputs}
+        pixels = {k: v for k, v in sorted(self.pixels.items()) if k in self.outputs}
+        data = {'version': MANIFEST_VERSION, 'inputs': inputs, 'outputs': dict(sorted(self.outputs.items())),
+                'pixels': pixels}
+        write_json_atomic(self.path, data, indent=1)
@@ -0,0 +1,204 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from build_manifest import write_json_atomic
+from sources import SNIFF_BYTES, sniff
+
+# ==========================================
+# Configurazione
+# ==========================================
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+SKIP_DIRS = {'.git', '.cache', '__pycache__', 'node_modules', '.venv', 'venv'}
+
+# Estensione -> formati accettati (quelli restituiti da sources.sniff)
+EXT_FORMATS = {
+    '.png': {'png'}, '.jpg': {'jpeg'}, '.jpeg': {'jpeg'}, '.gif': {'gif'}, '.webp': {'webp'},
+    '.avif': {'avif'}, '.svg': {'svg'}, '.ico': {'ico'}, '.bmp': {'bmp'},
+}
+# Avanzi di esecuzioni o modifiche a mano: segnalati anche se l'immagine è valida
+LEFTOVER_PREFIXES = ('error_screenshot_',)
+# Fine file attesa per formato: un file più corto del previsto è troncato
+PNG_END = b'IEND\xaeB`\x82'
+JPEG_END = b'\xff\xd9'
+TAIL_BYTES = 1024
+
+ERROR = 'error'
+WARNING = 'warning'
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+# ==========================================
+# Elenco dei file e dimensioni attese
+# ==========================================
+
+def iter_images(root=ROOT_DIR):
+    """Percorsi relativi di immagini e di file "quasi immagine" (es. 'logo.pngbk', 'cover.jpg.bak')."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for name in sorted(filenames):
+            lower = name.lower()
+            if any(ext in lower for ext in EXT_FORMATS):
+                yield os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, '/')
+
+
+def expected_sizes(root=ROOT_DIR):
+    """(cartella, filtro sul nome) -> (larghezza, altezza) dai preset di matchup e copertine."""
+    from asset_manifest import COVER_SETS
+    from matchup import LEAGUES
+
+    rules = {}
+    for conf in LEAGUES.values():
+        for preset in conf['presets']:
+            folder = '/'.join(p for p in (conf['directory'], preset.get('subdir', '')) if p)
+            rules[(folder, '_vs_')] = (preset['width'], preset['height'])
+    try:
+        from covers import PRESETS
+    except ImportError:
+        PRESETS = {}
+    for directory in COVER_SETS.values():
+        for name, preset in PRESETS.items():
+            rules[(f"{directory}/{name}", '')] = (preset['width'], preset['height'])
+    return rules
+
+
+def expected_size(rel, rules):
+    folder, _, name = rel.rpartition('/')
+    for (rule_folder, marker), size in rules.items():
+        if folder == rule_folder and marker in name:
+            return size
+    # derivatives/<logo>/<larghezza>.<ext>: conta solo la larghezza
+    parts = rel.split('/')
+    if len(parts) == 3 and parts[0] == 'derivatives' and os.path.splitext(parts[2])[0].isdigit():
+        return int(os.path.splitext(parts[2])[0]), None
+    return None
+
+# ==========================================
+# Controlli
+# ==========================================
+
+def _truncated(f, kind, size):
+    """Controlla solo la fine del file: PNG senza IEND, JPEG senza EOI, WebP più corta del RIFF dichiarato."""
+    if kind == 'webp':
+        f.seek(4)
+        return int.from_bytes(f.read(4), 'little') + 8 > size
+    f.seek(max(0, size - TAIL_BYTES))
+    tail = f.read()
+    if kind == 'png':
+        return PNG_END not in tail
+    if kind == 'jpeg':
+        return JPEG_END not in tail
+    if kind == 'gif':
+        return not tail.rstrip(b'\x00').endswith(b';')
+    return False
+
+
+def check_file(rel, root=ROOT_DIR, expected=None):
+    """Problemi di un file (lista di (gravità, descrizione)) e se è stato necessario decodificarlo."""
+    from PIL import Image
+
+    path = os.path.join(root, rel)
+    name = os.path.basename(rel)
+    stem, ext = os.path.splitext(name)
+    ext = ext.lower()
+    issues = []
+    # '.jpg' da solo: splitext lo considera un nome senza estensione
+    if not stem or name.lower() in EXT_FORMATS:
+        issues.append((ERROR, "nome file vuoto"))
+        ext = name.lower()
+    if ext not in EXT_FORMATS:
+        issues.append((WARNING, f"estensione '{ext}' non da immagine (copia di backup?)"))
+    if name.startswith(LEFTOVER_PREFIXES):
+        issues.append((WARNING, "file residuo di un'esecuzione precedente"))
+
+    size = os.path.getsize(path)
+    if size == 0:
+        return issues + [(ERROR, "file vuoto (0 byte)")], False
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+        kind = sniff(head)
+        if kind == 'html':
+            return issues + [(ERROR, "pagina HTML al posto dell'immagine")], False
+        if kind is None:
+            return issues + [(ERROR, f"formato non riconosciuto (inizia con {head[:8]!r})")], False
+        truncated = _truncated(f, kind, size)
+    suspicious = truncated
+    if ext in EXT_FORMATS and kind not in EXT_FORMATS[ext]:
+        issues.append((WARNING, f"estensione {ext} ma contenuto {kind}"))
+        suspicious = True
+
+    decoded = False
+    if kind != 'svg':
+        try:
+            # open() legge solo l'header; i pixel si decodificano solo per i file sospetti
+            with Image.open(path) as img:
+                width, height = img.size
+                if suspicious:
+                    img.load()
+                    decoded = True
+        except Exception as e:
+            return issues + [(ERROR, f"non decodificabile: {e}")], suspicious
+        if truncated:
+            # Marcatore finale assente ma pixel leggibili (es. dati in coda tagliati): solo un avviso
+            issues.append((WARNING, "fine file mancante, immagine comunque decodificabile"))
+        if expected:
+            exp_w, exp_h = expected
+            if width != exp_w or (exp_h is not None and height != exp_h):
+                want = f"{exp_w}x{exp_h}" if exp_h is not None else f"larghezza {exp_w}"
+                issues.append((WARNING, f"dimensioni {width}x{height}, attese {want}"))
+    return issues, decoded
+
+
+def scan(root=ROOT_DIR, max_workers=MAX_WORKERS):
+    """Controlla tutte le immagini del repository in parallelo; restituisce il report."""
+    start = time.perf_counter()
+    rules = expected_sizes(root)
+    files = list(iter_images(root))
+
+    def task(rel):
+        return rel, *check_file(rel, root, expected_size(rel, rules))
+
+    # Thread e non processi: il lavoro è quasi tutto I/O e parsing di header (Pillow rilascia il GIL
+    # durante la decodifica), e si evita di avviare interpreti e serializzare i risultati
+    with ThreadPoolExecutor(max_workers) as pool:
+        results = list(pool.map(task, files))
+    issues = [{'path': rel, 'severity': sev, 'issue': text} for rel, found, _ in results for sev, text in found]
+    return {
+        'generatedAt': utc_now(),
+        'root': os.path.abspath(root),
+        'filesChecked': len(files),
+        'decoded': sum(1 for _, _, decoded in results if decoded),
+        'errors': sum(1 for i in issues if i['severity'] == ERROR),
+        'warnings': sum(1 for i in issues if i['severity'] == WARNING),
+        'seconds': round(time.perf_counter() - start, 2),
+        'issues': issues,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Controlla tutte le immagini del repository (formato, dimensioni, file "
+                                                 "vuoti o troncati) prima di un commit di asset generati.")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--report', help="salva il report in questo file JSON")
+    parser.add_argument('--strict', action='store_true', help="esce con codice 1 anche per i soli avvisi")
+    args = parser.parse_args(argv)
+
+    report = scan(max_workers=args.workers)
+    for issue in report['issues']:
+        print(f"{'ERRORE' if issue['severity'] == ERROR else 'AVVISO'}: {issue['path']}: {issue['issue']}")
+    print(f"{report['filesChecked']} file controllati in {report['seconds']:.2f}s ({report['decoded']} decodificati): "
+          f"{report['errors']} errori, {report['warnings']} avvisi")
+    if args.report:
+        write_json_atomic(args.report, report, indent=2, ensure_ascii=False)
+    if report['errors'] or (args.strict and report['warnings']):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,158 @@
+import argparse
+import os
+import sys
+from PIL import Image
+
+from build_manifest import sha256_file, write_json_atomic
+
+# ==========================================
+# Configurazione
+# ==========================================
+PRESET_DIRS = ('portrait', 'landscape')
+HASH_SIZE = 16  # dHash 16x16 = 256 bit
+NEAR_DUP_THRESHOLD = 6  # distanza di Hamming massima tra due dHash
+
+# ==========================================
+# Scansione
+# ==========================================
+
+def iter_covers(root):
+    """Restituisce i percorsi relativi (es. 'landscape/rai-1.jpg') delle copertine di ogni preset."""
+    for preset in PRESET_DIRS:
+        folder = os.path.join(root, preset)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if os.path.isfile(os.path.join(folder, name)):
+                yield f"{preset}/{name}"
+
+
+def group_by_hash(root, paths):
+    """hash sha256 -> lista dei percorsi con quel contenuto."""
+    groups = {}
+    for rel in paths:
+        groups.setdefault(sha256_file(os.path.join(root, rel)), []).append(rel)
+    return groups
+
+
+def dhash(path, size=HASH_SIZE):
+    """Hash percettivo a differenze (size*size bit) della zona centrale, dove sta il logo.
+
+    Lo sfondo delle copertine è lo stesso per tutti i canali: includerlo renderebbe simili tutti gli hash.
+    """
+    import numpy as np
+    with Image.open(path) as img:
+        img.draft('L', (img.width // 4, img.height // 4))  # decodifica JPEG ridotta: basta una miniatura
+        gray = img.convert('L')
+    w, h = gray.size
+    box = (w // 4, h // 4, w * 3 // 4, h * 3 // 4) if w > h else (w // 16, h // 4, w * 15 // 16, h * 3 // 4)
+    small = np.asarray(gray.crop(box).resize((size + 1, size), Image.BOX), dtype=np.int16)
+    return np.packbits((small[:, 1:] > small[:, :-1]).ravel())
+
+
+def near_duplicates(hashes, threshold=NEAR_DUP_THRESHOLD, block=512):
+    """Coppie (a, b, distanza) con distanza di Hamming entro la soglia, confronto a blocchi con numpy."""
+    import numpy as np
+    keys = list(hashes)
+    if len(keys) < 2:
+        return []
+    bits = np.unpackbits(np.stack([hashes[k] for k in keys]), axis=1).astype(np.int32)
+    ones = bits.sum(axis=1)
+    pairs = []
+    for start in range(0, len(keys), block):
+        chunk = bits[start:start + block]
+        distances = ones[start:start + block, None] + ones[None, :] - 2 * (chunk @ bits.T)
+        for i, j in zip(*np.nonzero(distances <= threshold)):
+            i += start
+            if i < j:
+                pairs.append((keys[i], keys[j], int(distances[i - start, j])))
+    return sorted(pairs)
+
+
+def analyse(root, threshold=NEAR_DUP_THRESHOLD):
+    paths = list(iter_covers(root))
+    groups = group_by_hash(root, paths)
+    duplicates = {h: members for h, members in groups.items() if len(members) > 1}
+    wasted = sum(os.path.getsize(os.path.join(root, members[0])) * (len(members) - 1)
+                 for members in duplicates.values())
+    # Quasi-doppioni: un hash per contenuto unico, confrontati solo all'interno dello stesso preset
+    near = []
+    for preset in PRESET_DIRS:
+        perceptual = {}
+        for digest, members in groups.items():
+            first = next((m for m in members if m.startswith(f"{preset}/")), None)
+            if first is None:
+                continue
+            try:
+                perceptual[digest] = dhash(os.path.join(root, first))
+            except OSError as e:
+                print(f"AVVISO: impossibile leggere {first}: {e}")
+        near.extend(
+            {'a': next(m for m in groups[a] if m.startswith(f"{preset}/")),
+             'b': next(m for m in groups[b] if m.startswith(f"{preset}/")), 'distance': d}
+            for a, b, d in near_duplicates(perceptual, threshold)
+        )
+    return {
+        'files': len(paths),
+        'unique': len(groups),
+        'duplicateGroups': len(duplicates),
+        'bytesWasted': wasted,
+        'duplicates': {h: members for h, members in sorted(duplicates.items(), key=lambda x: -len(x[1]))},
+        'nearDuplicates': near,
+        'suspicious': [p for p in paths if not os.path.splitext(os.path.basename(p))[0]],
+        'groups': groups,
+    }
+
+# ==========================================
+# Deduplica su disco
+# ==========================================
+# Solo hardlink: ogni copertina resta al suo percorso (covers.py e chi la scarica per nome canale la trovano),
+# i doppioni condividono il blob. Git deduplica già per contenuto, quindi il repository non cambia.
+
+def _replace_with_link(src, dst):
+    tmp = f"{dst}.tmp-link"
+    os.link(src, tmp)
+    os.replace(tmp, dst)
+
+
+def apply_hardlinks(root, groups):
+    """Sostituisce i doppioni con hardlink alla prima copia: un solo blob su disco per contenuto."""
+    linked = 0
+    for members in groups.values():
+        canonical = os.path.join(root, members[0])
+        for rel in members[1:]:
+            path = os.path.join(root, rel)
+            if not os.path.samefile(canonical, path):
+                _replace_with_link(canonical, path)
+                linked += 1
+    return linked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deduplica le copertine generate per contenuto.")
+    parser.add_argument('root', nargs='?', default='generated-covers-world')
+    parser.add_argument('--mode', choices=['report', 'hardlink'], default='report',
+                        help="report: solo analisi; hardlink: doppioni -> hardlink alla prima copia")
+    parser.add_argument('--threshold', type=int, default=NEAR_DUP_THRESHOLD,
+                        help="distanza massima tra dHash per segnalare quasi-doppioni")
+    parser.add_argument('--report', help="salva l'analisi in questo file JSON")
+    args = parser.parse_args(argv)
+
+    result = analyse(args.root, args.threshold)
+    print(f"{args.root}: {result['files']} file, {result['unique']} contenuti unici, "
+          f"{result['duplicateGroups']} gruppi di doppioni ({result['bytesWasted'] / 1048576:.1f} MB ripetuti), "
+          f"{len(result['nearDuplicates'])} quasi-doppioni")
+    for rel in result['suspicious']:
+        print(f"AVVISO: nome vuoto: {rel}")
+
+    if args.mode == 'hardlink':
+        print(f"Creati {apply_hardlinks(args.root, result['groups'])} hardlink")
+
+    if args.report:
+        report = {k: v for k, v in result.items() if k != 'groups'}
+        write_json_atomic(args.report, report, indent=2)
+        print(f"Analisi salvata in {args.report}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,533 @@
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+from PIL import Image, ImageDraw, ImageFilter
+
+from build_manifest import BuildManifest, params_key
+from encoders import TIERS, encode, output_pixel_hash, tier_ext, write_if_changed
+from fetch_scheduler import MAX_WORKERS, FetchScheduler
+from http_cache import DEFAULT_CACHE_DIR, HTTPCache
+from sources import LogoSource, RasterCache
+
+# ==========================================
+# Configurazione
+# ==========================================
+PRESETS = {
+    'portrait': {'width': 600, 'height': 900, 'logo_box': (500, 380)},
+    'landscape': {'width': 1000, 'height': 650, 'logo_box': (560, 300)},
+}
+COVER_TIER = 'jpeg'
+REPORT_NAME = 'generation-report.json'
+JOURNAL_NAME = 'generation-report.partial.jsonl'
+MANIFEST_NAME = '.covers-manifest.json'
+BG_CENTER = (34, 18, 96)
+BG_EDGE = (6, 2, 14)
+GLOW_COLOR = (110, 90, 240)
+GLOW_RADIUS = 18
+
+CHUNK_SIZE = 1 << 16
+RECENT_SOURCES = 64  # sorgenti già decodificate tenute in memoria per gli URL ripetuti
+FLUSH_SECONDS = 10.0
+
+NAME_KEYS = ('channelName', 'name', 'title', 'tvg-name', 'tvgName')
+URL_KEYS = ('logo', 'url', 'tvg-logo', 'tvgLogo', 'image', 'icon')
+
+# ==========================================
+# Lettura della lista canali
+# ==========================================
+
+def slugify(name):
+    """'Sky Sport 251' -> 'sky-sport-251' (stesso schema dei file in generated-covers*)."""
+    text = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii').lower()
+    return re.sub(r'[^a-z0-9]+', '-', text).strip('-')
+
+
+def _channel_from(key, value):
+    if isinstance(value, str):
+        return key, value
+    if isinstance(value, dict):
+        name = next((value[k] for k in NAME_KEYS if value.get(k)), key)
+        url = next((value[k] for k in URL_KEYS if value.get(k)), '')
+        return name, url
+    return None
+
+
+def iter_parsed(items):
+    """Canali (nome, url) da coppie (chiave, valore); la chiave è None per gli elementi di una lista.
+
+    Un elemento senza nome passa come nome vuoto: pending_covers lo segnala nel report ("Nome canale vuoto").
+    """
+    for key, value in items:
+        channel = _channel_from(key, value)
+        if channel:
+            name = '' if channel[0] is None else str(channel[0]).strip()
+            yield name, (channel[1] or '').strip()
+
+
+def parse_channels(data):
+    """Accetta {nome: url}, {nome: {logo: ...}} oppure [{name/channelName, logo/url}, ...]."""
+    items = data.items() if isinstance(data, dict) else ((None, item) for item in data)
+    return list(iter_parsed(items))
+
+
+def load_channels(path):
+    """Legge world.json o logo-map.js (l'oggetto JS viene estratto dal file)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        return parse_channels(json.loads(text))
+    except json.JSONDecodeError:
+        pass
+    # logo-map.js: prende il primo letterale oggetto/array e, se non è JSON valido, le coppie "nome": "url"
+    start = min((i for i in (text.find('{'), text.find('[')) if i >= 0), default=-1)
+    end = max(text.rfind('}'), text.rfind(']'))
+    if start >= 0 and end > start:
+        try:
+            return parse_channels(json.loads(text[start:end + 1]))
+        except json.JSONDecodeError:
+            pass
+    pairs = re.findall(r'["\']([^"\'\n]+)["\']\s*:\s*["\'](https?://[^"\'\s]+)["\']', text)
+    return [(name.strip(), url) for name, url in pairs]
+
+
+def iter_json_items(f, chunk_size=CHUNK_SIZE):
+    """Elementi del contenitore JSON di primo livello come (chiave, valore), letti a blocchi dal file.
+
+    In memoria resta solo l'elemento corrente: la lista canali può avere qualsiasi lunghezza.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = '', 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    def skip(chars=' \t\r\n'):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def decode():
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if not eof and isinstance(value, (int, float)) and not buf[end:].strip('0123456789+-.eE'):
+                # Un numero che arriva (quasi) a fine blocco può continuare nel successivo: '12' + '.5', '1' + 'e3'
+                fill()
+                continue
+            pos = end
+            return value
+
+    fill()
+    skip(' \t\r\n\ufeff')
+    if pos >= len(buf) or buf[pos] not in '[{':
+        raise ValueError("La lista canali deve essere un oggetto o un array JSON")
+    is_dict = buf[pos] == '{'
+    pos += 1
+    while True:
+        skip(' \t\r\n,')
+        if pos >= len(buf):
+            raise ValueError("JSON troncato")
+        if buf[pos] in ']}':
+            return
+        key = None
+        if is_dict:
+            key = decode()
+            skip()
+            if buf[pos:pos + 1] != ':':
+                raise ValueError(f"Atteso ':' dopo la chiave {key!r}")
+            pos += 1
+            skip()
+        yield key, decode()
+
+
+def iter_channels(path):
+    """Canali (nome, url) letti in streaming dai .json; gli altri formati (logo-map.js) passano da load_channels."""
+    if not path.lower().endswith('.json'):
+        yield from load_channels(path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from iter_parsed(iter_json_items(f))
+
+# ==========================================
+# Rendering
+# ==========================================
+
+_backgrounds = {}
+
+
+def background(preset_name):
+    """Sfondo a gradiente radiale del preset (calcolato una volta per esecuzione)."""
+    if preset_name not in _backgrounds:
+        preset = PRESETS[preset_name]
+        size = (preset['width'], preset['height'])
+        mask = Image.radial_gradient('L').resize(size, Image.BILINEAR)
+        _backgrounds[preset_name] = Image.composite(Image.new('RGB', size, BG_EDGE), Image.new('RGB', size, BG_CENTER),
+                                                    mask).convert('RGBA')
+    return _backgrounds[preset_name]
+
+
+def fit_logo(source, box):
+    scale = min(box[0] / source.width, box[1] / source.height)
+    size = (max(1, round(source.width * scale)), max(1, round(source.height * scale)))
+    return source.resize(size, Image.LANCZOS)
+
+
+def render_cover(source, preset_name):
+    """Copertina: sfondo, alone dietro al logo e logo centrato nel riquadro del preset (source: LogoSource)."""
+    preset = PRESETS[preset_name]
+    cover = background(preset_name).copy()
+    logo = fit_logo(source.image(preset['logo_box']), preset['logo_box'])
+    x = (preset['width'] - logo.width) // 2
+    y = (preset['height'] - logo.height) // 2
+
+    glow = Image.new('RGBA', cover.size)
+    ImageDraw.Draw(glow).rectangle((x, y, x + logo.width, y + logo.height), fill=GLOW_COLOR + (170,))
+    cover.alpha_composite(glow.filter(ImageFilter.GaussianBlur(GLOW_RADIUS)))
+    cover.alpha_composite(logo, (x, y))
+    return cover
+
+
+def decode_logo(data, raster_cache=None):
+    """Controlla i primi byte (le pagine HTML vengono scartate senza decodificarle) e prepara la sorgente."""
+    return LogoSource(data, raster_cache)
+
+# ==========================================
+# Generazione
+# ==========================================
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+class ReportWriter:
+    """Report di generazione scritto man mano che i risultati arrivano.
+
+    Ogni errore e ogni copertina generata vengono aggiunti subito a un journal JSON Lines
+    (generation-report.partial.jsonl) insieme a contatori periodici: se l'esecuzione si interrompe il journal è
+    un report parziale, utilizzabile con --resume. Alla chiusura il journal diventa generation-report.json.
+
+    previous: coppie (canale, preset) generate dalle esecuzioni riprese; quelle rifatte in questa esecuzione
+    escono dall'insieme, le altre restano nel report finale (e nel conteggio) senza contarle due volte.
+    """
+
+    def __init__(self, input_path, output_dir, presets, retry=frozenset(), flush_seconds=FLUSH_SECONDS,
+                 previous=None):
+        self.path = os.path.join(output_dir, REPORT_NAME)
+        self.journal_path = os.path.join(output_dir, JOURNAL_NAME)
+        self.header = {
+            'generatedAt': utc_now(),
+            'input': os.path.abspath(input_path),
+            'output': os.path.abspath(output_dir),
+            'presets': list(presets),
+        }
+        self.channels = 0
+        self.covers = 0
+        self.failed = 0
+        self.retry = retry
+        self.recovered = 0
+        self.previous = previous
+        self.redone = 0  # coppie rifatte che non erano errori (canali nuovi o con URL cambiato)
+        self.flush_seconds = flush_seconds
+        self._last_flush = time.monotonic()
+        os.makedirs(output_dir, exist_ok=True)
+        self._journal = open(self.journal_path, 'w', encoding='utf-8')
+        self._write({'header': self.header})
+
+    def _write(self, entry):
+        self._journal.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._journal.flush()
+
+    def progress(self):
+        return {'channelsProcessed': self.channels, 'coversGenerated': self.covers}
+
+    def fail(self, name, preset_name, url, error):
+        self.failed += 1
+        self._write({'failure': {'channelName': name, 'presetName': preset_name, 'url': url, 'error': error}})
+
+    def reprocess(self, name, preset_name):
+        """La coppia viene rifatta in questa esecuzione: non è più una copertina dell'esecuzione ripresa."""
+        if self.previous is not None:
+            self.previous.discard((name, preset_name))
+        if (name, preset_name) not in self.retry:
+            self.redone += 1
+
+    def generated(self, name, preset_name):
+        self.covers += 1
+        if (name, preset_name) in self.retry:
+            self.recovered += 1
+        self._write({'generated': {'channelName': name, 'presetName': preset_name}})
+
+    def checkpoint(self):
+        """Scrive i contatori se è passato abbastanza tempo dall'ultima volta; True se ha scritto."""
+        if time.monotonic() - self._last_flush < self.flush_seconds:
+            return False
+        self._write({'progress': self.progress()})
+        self._last_flush = time.monotonic()
+        return True
+
+    def abort(self):
+        """Chiude il journal lasciandolo su disco come report parziale."""
+        self._write({'progress': self.progress()})
+        self._journal.close()
+
+    def _copy_list(self, out, name, entries):
+        out.write(f',\n  "{name}": [')
+        first = True
+        for entry in entries:
+            item = json.dumps(entry, indent=2, ensure_ascii=False).replace('\n', '\n    ')
+            out.write(('\n    ' if first else ',\n    ') + item)
+            first = False
+        out.write(']' if first else '\n  ]')
+
+    def _journal_entries(self, kind):
+        with open(self.journal_path, 'r', encoding='utf-8') as journal:
+            for line in journal:
+                entry = json.loads(line).get(kind)
+                if entry is not None:
+                    yield entry
+
+    def close(self, **extra):
+        """Chiude il journal e scrive il report finale copiando errori e copertine dal journal, uno alla volta.
+
+        Le copertine delle esecuzioni riprese non rifatte (previous) seguono quelle di questa esecuzione.
+        """
+        self._write({'progress': self.progress()})
+        self._journal.close()
+        head = json.dumps({**self.header, **self.progress(), **extra}, indent=2, ensure_ascii=False)
+        carried = ({'channelName': name, 'presetName': preset_name} for name, preset_name in sorted(self.previous or ()))
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as out:
+            out.write(head[:-2])
+            self._copy_list(out, 'failures', self._journal_entries('failure'))
+            self._copy_list(out, 'generated', itertools.chain(self._journal_entries('generated'), carried))
+            out.write('\n}')
+        os.replace(tmp, self.path)
+        os.remove(self.journal_path)
+
+
+def cover_name(preset_name, channel_name):
+    """Percorso relativo della copertina, es. 'landscape/rai-1.jpg' (chiave anche nel manifest)."""
+    return f"{preset_name}/{slugify(channel_name)}{tier_ext(COVER_TIER)}"
+
+
+def cover_path(output_dir, preset_name, channel_name):
+    return os.path.join(output_dir, *cover_name(preset_name, channel_name).split('/'))
+
+
+def cover_key(url, preset_name):
+    """La copertina va rigenerata se cambia l'URL del logo, il preset o il formato."""
+    return params_key(url, PRESETS[preset_name], TIERS[COVER_TIER])
+
+
+def pending_covers(url, names, presets, output_dir, report, manifest, force=False, retry=frozenset()):
+    """Coppie (canale, preset) da generare per un URL; i nomi che non producono un file finiscono nel report.
+
+    Sono da generare le copertine mancanti, quelle con URL cambiato e le coppie in retry (errori precedenti).
+    """
+    pending = []
+    for name in names:
+        if not slugify(name):
+            for p in presets:
+                report.fail(name, p, url, "Nome canale vuoto")
+            continue
+        for preset_name in presets:
+            rel = cover_name(preset_name, name)
+            path = cover_path(output_dir, preset_name, name)
+            key = cover_key(url, preset_name)
+            if force or (name, preset_name) in retry:
+                pending.append((name, preset_name))
+            elif manifest.is_fresh(rel, key, path):
+                continue
+            elif not manifest.existed and os.path.exists(path):
+                # Primo avvio con copertine già presenti: si adottano senza rigenerarle
+                manifest.record(rel, key)
+            else:
+                pending.append((name, preset_name))
+    return pending
+
+
+def render_group(url, pending, source, encoded, output_dir, report, manifest):
+    """Scrive le copertine in attesa per una sorgente; ogni preset è renderizzato e codificato una volta sola."""
+    for name, preset_name in pending:
+        rel = cover_name(preset_name, name)
+        try:
+            if preset_name not in encoded:
+                cover = render_cover(source, preset_name)
+                data = encode(cover, COVER_TIER)
+                encoded[preset_name] = data, output_pixel_hash(cover, COVER_TIER, data)
+            data, pixels = encoded[preset_name]
+            # Stessi pixel della copertina già salvata: il file resta com'è (niente modifiche da committare)
+            write_if_changed(cover_path(output_dir, preset_name, name), data, pixels, manifest.pixels.get(rel))
+            manifest.record(rel, cover_key(url, preset_name), pixels)
+            report.generated(name, preset_name)
+        except Exception as e:
+            manifest.forget(rel)
+            report.fail(name, preset_name, url, str(e))
+
+
+def fail_group(url, pending, error, report, manifest):
+    for name, preset_name in pending:
+        manifest.forget(cover_name(preset_name, name))
+        report.fail(name, preset_name, url, error)
+
+
+def load_report(path):
+    """Report precedente: generation-report.json oppure il journal parziale di un'esecuzione interrotta."""
+    if not path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    report = {'failures': [], 'generated': [], 'coversGenerated': 0}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break  # ultima riga scritta a metà
+            if 'header' in entry:
+                report.update(entry['header'])
+            elif 'progress' in entry:
+                report.update(entry['progress'])
+            elif 'failure' in entry:
+                report['failures'].append(entry['failure'])
+            elif 'generated' in entry:
+                report['generated'].append(entry['generated'])
+    return report
+
+
+def generate(input_path, output_dir, presets=tuple(PRESETS), cache=None, force=False, max_workers=MAX_WORKERS,
+             resume=None):
+    """Genera le copertine in streaming; con resume (report precedente) rifà solo gli errori e i canali nuovi o cambiati.
+
+    I canali vengono letti uno alla volta e i download sono limitati a MAX_PENDING URL in sospeso: la memoria
+    resta costante qualunque sia la lunghezza della lista.
+    """
+    cache = cache or HTTPCache()
+    manifest = BuildManifest(os.path.join(output_dir, MANIFEST_NAME))
+    retry = frozenset((f['channelName'], f['presetName']) for f in resume['failures']) if resume else frozenset()
+    # Copertine già generate dalle esecuzioni riprese (i report precedenti a questa lista hanno solo il conteggio)
+    previous = None
+    if resume and 'generated' in resume:
+        previous = {(g['channelName'], g['presetName']) for g in resume['generated']}
+    report = ReportWriter(input_path, output_dir, presets, retry, previous=previous)
+    scheduler = FetchScheduler(cache.fetch, max_workers)
+    raster_cache = RasterCache()
+    print(f"[COVERS] {input_path}, preset: {', '.join(presets)}" + (f", ripresa di {len(retry)} errori" if resume else ""))
+
+    waiting = {}  # url -> copertine in attesa del download
+    recent = OrderedDict()  # url -> (sorgente, byte codificati per preset) oppure errore, per gli URL ripetuti
+
+    def urls_to_fetch():
+        for name, url in iter_channels(input_path):
+            report.channels += 1
+            pending = pending_covers(url, [name], presets, output_dir, report, manifest, force, retry)
+            if not pending:
+                continue
+            for pair in pending:
+                report.reprocess(*pair)
+            if not url:
+                fail_group(url, pending, "URL logo mancante", report, manifest)
+            elif url in waiting:
+                waiting[url].extend(pending)
+            elif url in recent:
+                recent.move_to_end(url)
+                done = recent[url]
+                if isinstance(done, str):
+                    fail_group(url, pending, done, report, manifest)
+                else:
+                    render_group(url, pending, *done, output_dir, report, manifest)
+            else:
+                waiting[url] = pending
+                yield url
+
+    start = time.perf_counter()
+    try:
+        # I download procedono in parallelo (con i limiti per host); il rendering avviene man mano che arrivano
+        for url, data, error in scheduler.run(urls_to_fetch()):
+            pending = waiting.pop(url)
+            if error is None:
+                try:
+                    done = (decode_logo(data, raster_cache), {})
+                except Exception as e:
+                    error = e
+            if error is not None:
+                done = str(error)
+                fail_group(url, pending, done, report, manifest)
+            else:
+                render_group(url, pending, *done, output_dir, report, manifest)
+            recent[url] = done
+            if len(recent) > RECENT_SOURCES:
+                recent.popitem(last=False)
+            if report.checkpoint():
+                manifest.save()
+    except BaseException:
+        # Interruzione (errore o Ctrl+C): il journal resta come report parziale, il manifest registra il lavoro fatto
+        report.abort()
+        manifest.save()
+        raise
+
+    extra = {}
+    if resume:
+        extra = {'resumedFrom': resume.get('generatedAt'), 'recovered': report.recovered}
+        # Solo le copertine precedenti non rifatte in questa esecuzione (altrimenti si conterebbero due volte)
+        if previous is not None:
+            report.covers += len(report.previous)
+        else:
+            report.covers += max(resume.get('coversGenerated', 0) - report.redone, 0)
+    manifest.save()
+    report.close(**extra)
+    print(f"[COVERS] {report.channels} canali, {report.covers} copertine generate, {report.failed} errori "
+          f"in {time.perf_counter() - start:.1f}s (download: {cache.stats})"
+          + (f", {report.recovered} errori recuperati" if resume else ""))
+    print(f"[COVERS] Download: {scheduler.report()}; {raster_cache.report()}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera le copertine dei canali dalla mappa dei loghi.")
+    parser.add_argument('input', help="world.json o logo-map.js")
+    parser.add_argument('--output', default='generated-covers')
+    parser.add_argument('--presets', default=','.join(PRESETS), help="preset separati da virgola")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="cache HTTP su disco")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="download in parallelo (su tutti gli host)")
+    parser.add_argument('--resume', nargs='?', const=True, metavar='REPORT',
+                        help="riprende da un report precedente (default: il journal parziale o <output>/generation-report.json)")
+    parser.add_argument('--force', action='store_true', help="rigenera anche le copertine già presenti")
+    args = parser.parse_args(argv)
+
+    presets = [p.strip() for p in args.presets.split(',') if p.strip()]
+    unknown = [p for p in presets if p not in PRESETS]
+    if unknown:
+        parser.error(f"preset sconosciuti: {', '.join(unknown)}")
+    resume = None
+    if args.resume:
+        report_path = args.resume
+        if report_path is True:
+            # Dopo un'interruzione resta il journal parziale, più recente del report completo
+            journal = os.path.join(args.output, JOURNAL_NAME)
+            report_path = journal if os.path.exists(journal) else os.path.join(args.output, REPORT_NAME)
+        resume = load_report(report_path)
+    generate(args.input, args.output, presets, HTTPCache(args.cache_dir), args.force, args.workers, resume)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,172 @@
+import argparse
+import os
+import sys
+import time
+from PIL import Image
+
+from asset_manifest import probe
+from build_manifest import BuildManifest, params_key, write_json_atomic
+from encoders import TIERS, EncoderStats, encode_gated, output_pixel_hash, write_if_changed
+from sources import RasterCache, SourceError, open_logo
+
+# ==========================================
+# Configurazione
+# ==========================================
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DERIVATIVES_DIR = 'derivatives'
+INDEX_NAME = 'index.json'
+MANIFEST_NAME = '.derivatives-manifest.json'
+WIDTHS = (64, 128, 256, 512)
+# Formato -> livello di codifica (encoders.py): WebP con perdita e PNG a 256 colori passano dal controllo
+# qualità e, se non bastano, scendono alla versione senza perdita
+FORMATS = {'webp': 'webp', 'png': 'png8'}
+SOURCE_EXTS = ('.png', '.jpg', '.jpeg', '.svg')
+# Immagini nella radice che non sono loghi
+EXCLUDE_PREFIXES = ('error_screenshot_',)
+
+
+def find_sources(root=ROOT_DIR):
+    """Loghi nella radice del repository; un .svg solo se non esiste il raster con lo stesso nome."""
+    files = [f for f in sorted(os.listdir(root))
+             if os.path.splitext(f)[1].lower() in SOURCE_EXTS and os.path.isfile(os.path.join(root, f))
+             and not f.startswith(EXCLUDE_PREFIXES)]
+    rasters = {os.path.splitext(f)[0] for f in files if not f.lower().endswith('.svg')}
+    return [f for f in files if not f.lower().endswith('.svg') or os.path.splitext(f)[0] not in rasters]
+
+
+def source_size(path):
+    """Misura dal solo header; un SVG vale come largo quanto la misura più grande della piramide."""
+    info = probe(path)
+    if info['format'] == 'svg':
+        width, height = info['width'] or 1, info['height'] or 1
+        return WIDTHS[-1], max(1, round(height * WIDTHS[-1] / width))
+    return info['width'], info['height']
+
+
+def target_sizes(width, height, widths=WIDTHS):
+    """Larghezze della piramide (senza ingrandire) con l'altezza in proporzione; almeno una misura."""
+    chosen = [w for w in widths if w <= width] or [width]
+    return [(w, max(1, round(height * w / width))) for w in chosen]
+
+
+def derivative_name(stem, width, fmt):
+    """Percorso relativo alla radice, es. 'derivatives/Soccer/64.webp'."""
+    return f"{DERIVATIVES_DIR}/{stem}/{width}.{fmt}"
+
+
+def derivative_key(source_hash, size, fmt):
+    return params_key(source_hash, size, TIERS[FORMATS[fmt]], 'lanczos')
+
+# ==========================================
+# Generazione
+# ==========================================
+
+def build_levels(img, sizes):
+    """Piramide: ogni livello si ricava dal precedente (più grande), non dall'originale."""
+    levels = {}
+    source = img
+    for size in sorted(sizes, reverse=True):
+        # Il primo passo dall'originale (anche 2560 px -> 512) usa reducing_gap: riduzione intera prima di Lanczos
+        source = levels[size] = source.resize(size, Image.LANCZOS, reducing_gap=3.0 if source is img else None)
+    return levels
+
+
+def plan_source(name, root, manifest, force=False):
+    """(voce dell'indice, varianti da rigenerare per misura) di un logo; niente decodifica se è tutto aggiornato."""
+    path = os.path.join(root, name)
+    source_hash = manifest.file_hash(path, name)
+    width, height = source_size(path)
+    entries, pending = [], {}
+    for size in target_sizes(width, height):
+        entry = {'width': size[0], 'height': size[1]}
+        for fmt in FORMATS:
+            rel = derivative_name(os.path.splitext(name)[0], size[0], fmt)
+            key = derivative_key(source_hash, size, fmt)
+            out = os.path.join(root, rel)
+            if force or not (manifest.is_fresh(rel, key, out) or _adopt(manifest, rel, key, out)):
+                pending.setdefault(size, []).append((fmt, rel, key))
+            entry[fmt] = rel
+        entries.append(entry)
+    return {'source': name, 'width': width, 'height': height, 'sha256': source_hash, 'sizes': entries}, pending
+
+
+def _adopt(manifest, rel, key, out):
+    # Primo avvio (manifest assente, es. dopo un clone) con varianti già presenti: si adottano senza rigenerarle
+    if manifest.existed or not os.path.exists(out):
+        return False
+    manifest.record(rel, key)
+    return True
+
+
+def render_source(name, root, entry, pending, manifest, stats, raster_cache):
+    """Decodifica il logo una volta, costruisce tutta la piramide e scrive solo le varianti da rigenerare.
+
+    La piramide è sempre completa: una variante rigenerata da sola è identica a quella di una build completa.
+    """
+    sizes = [(size['width'], size['height']) for size in entry['sizes']]
+    img = open_logo(os.path.join(root, name), max(sizes), raster_cache)
+    levels = build_levels(img, sizes)
+    for size, outputs in pending.items():
+        for fmt, rel, key in outputs:
+            tier, data, seconds, ok = encode_gated(levels[size], FORMATS[fmt])
+            stats.add(tier, len(data), seconds, FORMATS[fmt], ok)
+            pixels = output_pixel_hash(levels[size], tier, data)
+            write_if_changed(os.path.join(root, rel), data, pixels, manifest.pixels.get(rel))
+            manifest.record(rel, key, pixels)
+
+
+def generate(root=ROOT_DIR, force=False):
+    """Aggiorna le varianti di tutti i loghi e l'indice derivatives/index.json."""
+    out_dir = os.path.join(root, DERIVATIVES_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = BuildManifest(os.path.join(out_dir, MANIFEST_NAME))
+    stats = EncoderStats()
+    raster_cache = RasterCache()
+    index, rendered, skipped = {}, 0, []
+    start = time.perf_counter()
+    for name in find_sources(root):
+        entry, pending = plan_source(name, root, manifest, force)
+        if pending:
+            try:
+                render_source(name, root, entry, pending, manifest, stats, raster_cache)
+            except SourceError as e:
+                print(f"AVVISO: {name} saltato: {e}")
+                skipped.append(name)
+                continue
+            rendered += 1
+        for size in entry['sizes']:
+            for fmt in FORMATS:
+                size[f"{fmt}Bytes"] = os.path.getsize(os.path.join(root, size[fmt]))
+        index[os.path.splitext(name)[0]] = entry
+    manifest.save()
+    write_json_atomic(os.path.join(out_dir, INDEX_NAME), {'widths': list(WIDTHS), 'logos': index}, indent=1)
+    print(f"{len(index)} loghi, {rendered} rigenerati, {len(index) - rendered} invariati, {len(skipped)} saltati "
+          f"in {time.perf_counter() - start:.1f}s ({manifest.hashed} file ricalcolati)")
+    if stats.tiers:
+        print(stats.report())
+    return index
+
+# ==========================================
+# Lettura (API per chi usa i loghi)
+# ==========================================
+
+def pick(index, stem, width, fmt='webp'):
+    """Variante più piccola larga almeno width (o la più grande disponibile), dall'indice caricato."""
+    entry = index['logos'].get(stem)
+    if entry is None:
+        return None
+    for size in entry['sizes']:
+        if size['width'] >= width:
+            return size[fmt]
+    return entry['sizes'][-1][fmt]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera le versioni 64/128/256/512 px (WebP e PNG) dei loghi nella radice.")
+    parser.add_argument('--force', action='store_true', help="rigenera tutte le varianti ignorando il manifest")
+    args = parser.parse_args(argv)
+    generate(force=args.force)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,297 @@
+import argparse
+import hashlib
+import io
+import math
+import os
+import sys
+import threading
+import time
+from PIL import Image, features
+
+# ==========================================
+# Livelli di codifica
+# ==========================================
+# 'fallback' indica il livello (dello stesso formato, se possibile) usato quando il controllo qualità
+# scarta l'immagine. I livelli senza perdita non hanno bisogno del controllo.
+TIERS = {
+    'png-optimize': {'format': 'PNG', 'ext': '.png', 'options': {'optimize': True}, 'lossless': True},
+    'png-fast': {'format': 'PNG', 'ext': '.png', 'options': {'compress_level': 1}, 'lossless': True},
+    'png8': {'format': 'PNG', 'ext': '.png', 'options': {'optimize': True}, 'quantize': 256,
+             'fallback': 'png-optimize'},
+    'webp-lossless': {'format': 'WEBP', 'ext': '.webp', 'options': {'lossless': True, 'quality': 100, 'method': 4},
+                      'lossless': True},
+    'webp': {'format': 'WEBP', 'ext': '.webp', 'options': {'quality': 90, 'method': 4, 'exact': False},
+             'fallback': 'webp-lossless'},
+    'avif': {'format': 'AVIF', 'ext': '.avif', 'options': {'quality': 80, 'speed': 6}, 'fallback': 'avif-hq'},
+    'avif-hq': {'format': 'AVIF', 'ext': '.avif', 'options': {'quality': 100, 'subsampling': '4:4:4', 'speed': 6}},
+    # Copertine dei canali (sfondo opaco): JPEG
+    'jpeg': {'format': 'JPEG', 'ext': '.jpg', 'options': {'quality': 90, 'optimize': True}, 'mode': 'RGB'},
+}
+DEFAULT_TIER = 'png-optimize'
+MIN_PSNR = 40.0
+MIN_SSIM = 0.99
+# Controllo qualità (TierGate): un livello scartato su tutte le prime GATE_SAMPLE immagini passa subito al fallback
+GATE_SAMPLE = 8
+
+MIME_TYPES = {'.png': 'image/png', '.webp': 'image/webp', '.avif': 'image/avif', '.jpg': 'image/jpeg'}
+
+
+def available_tiers():
+    """Livelli supportati dal Pillow installato (WebP e AVIF dipendono da come è stato compilato)."""
+    supported = {'PNG': True, 'JPEG': True, 'WEBP': features.check('webp'), 'AVIF': features.check('avif')}
+    return [name for name, tier in TIERS.items() if supported.get(tier['format'])]
+
+
+def tier_ext(tier):
+    return TIERS[tier]['ext']
+
+
+def alpha_tiers():
+    """Livelli che conservano la trasparenza (utilizzabili per i matchup: il JPEG la perde)."""
+    return [name for name, tier in TIERS.items() if tier.get('mode') != 'RGB']
+
+
+def encode(img, tier=DEFAULT_TIER):
+    conf = TIERS[tier]
+    if conf.get('quantize'):
+        img = img.quantize(conf['quantize'], method=Image.Quantize.FASTOCTREE)
+    elif conf.get('mode') and img.mode != conf['mode']:
+        img = img.convert(conf['mode'])
+    if img.info:
+        # Niente metadati ereditati dalla sorgente (profilo ICC, EXIF, testo PNG): stessi pixel, stessi byte
+        img = img.copy()
+        img.info = {}
+    buf = io.BytesIO()
+    img.save(buf, conf['format'], **conf['options'])
+    return buf.getvalue()
+
+# ==========================================
+# Scrittura riproducibile
+# ==========================================
+# Un output si riscrive solo se cambiano i pixel: rigenerare con un'altra versione di zlib/libwebp o con
+# --force non produce file diversi (e commit) per immagini identiche. L'hash dei pixel va nel manifest.
+
+def pixel_hash(img):
+    """Hash di dimensioni e pixel RGBA, indipendente da formato, compressione e metadati."""
+    rgba = img if img.mode == 'RGBA' else img.convert('RGBA')
+    h = hashlib.sha256(f"{rgba.width}x{rgba.height}:".encode('ascii'))
+    h.update(rgba.tobytes())
+    return h.hexdigest()
+
+
+def output_pixel_hash(img, tier, data):
+    """Hash dei pixel che vedrà chi apre il file: dall'immagine per i PNG senza perdita, altrimenti decodificando.
+
+    (WebP lossless può cambiare il colore dei pixel del tutto trasparenti: si decodifica anche quello.)
+    """
+    if TIERS[tier].get('lossless') and TIERS[tier]['format'] == 'PNG':
+        return pixel_hash(img)
+    with Image.open(io.BytesIO(data)) as decoded:
+        return pixel_hash(decoded)
+
+
+def file_pixel_hash(path):
+    try:
+        with Image.open(path) as img:
+            return pixel_hash(img)
+    except (OSError, ValueError):
+        return None
+
+
+def write_if_changed(path, data, pixels, stored=None):
+    """Scrive data (in modo atomico) solo se i pixel sono diversi da quelli del file esistente; True se ha scritto.
+
+    stored è l'hash registrato nel manifest; senza, si decodifica il file già presente.
+    """
+    if os.path.exists(path) and (stored or file_pixel_hash(path)) == pixels:
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", 'wb') as f:
+        f.write(data)
+    os.replace(f"{path}.tmp", path)
+    return True
+
+# ==========================================
+# Controllo qualità
+# ==========================================
+
+def _premultiplied(img):
+    import numpy as np
+    arr = np.asarray(img.convert('RGBA'), dtype=np.float64)
+    alpha = arr[..., 3:4] / 255.0
+    return np.concatenate([arr[..., :3] * alpha, arr[..., 3:4]], axis=-1)
+
+
+def _window_mean(arr, win):
+    # Media su finestre win x win tramite somme cumulate (equivalente a un box filter "valid")
+    import numpy as np
+    c = np.cumsum(np.cumsum(np.pad(arr, ((1, 0), (1, 0))), axis=0), axis=1)
+    return (c[win:, win:] - c[:-win, win:] - c[win:, :-win] + c[:-win, :-win]) / (win * win)
+
+
+def quality(reference, data, win=8):
+    """PSNR (dB) e SSIM medio tra l'immagine di riferimento e i byte codificati, su RGBA premoltiplicato."""
+    import numpy as np
+    with Image.open(io.BytesIO(data)) as decoded:
+        ref, out = _premultiplied(reference), _premultiplied(decoded)
+
+    mse = float(np.mean((ref - out) ** 2))
+    psnr = math.inf if mse == 0 else 10 * math.log10(255.0 ** 2 / mse)
+    if mse == 0:
+        return psnr, 1.0
+
+    win = min(win, ref.shape[0], ref.shape[1])
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    scores = []
+    for ch in range(4):
+        x, y = ref[..., ch], out[..., ch]
+        mx, my = _window_mean(x, win), _window_mean(y, win)
+        vx = _window_mean(x * x, win) - mx * mx
+        vy = _window_mean(y * y, win) - my * my
+        cov = _window_mean(x * y, win) - mx * my
+        ssim = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx * mx + my * my + c1) * (vx + vy + c2))
+        scores.append(float(ssim.mean()))
+    return psnr, sum(scores) / len(scores)
+
+
+def passes(psnr, ssim, min_psnr=MIN_PSNR, min_ssim=MIN_SSIM):
+    return psnr >= min_psnr and ssim >= min_ssim
+
+
+class TierGate:
+    """Scorciatoia del controllo qualità, per livello: se le prime `sample` immagini sono state tutte scartate
+    (es. png8/webp/avif sugli stemmi reali) le successive passano subito al fallback, senza codifica di prova.
+
+    Finché il livello non è scartato ogni immagine viene misurata: un campione accettato non garantisce le
+    altre (in Serie A le prime 8 sono tutte partite dell'Atalanta, bologna_vs_cagliari in png8 resta sotto soglia).
+    """
+
+    def __init__(self, sample=GATE_SAMPLE):
+        self.sample = sample
+        self.results = {}  # livello -> [controllate, accettate]
+        self._lock = threading.Lock()  # condiviso dai thread delle richieste in matchup_server.py
+
+    def rejected(self, tier):
+        """True se il livello è stato scartato su tutto il campione."""
+        with self._lock:
+            checked, accepted = self.results.get(tier, (0, 0))
+        return checked >= self.sample and accepted == 0
+
+    def record(self, tier, ok):
+        with self._lock:
+            entry = self.results.setdefault(tier, [0, 0])
+            entry[0] += 1
+            entry[1] += int(ok)
+
+
+def encode_gated(img, tier=DEFAULT_TIER, min_psnr=MIN_PSNR, min_ssim=MIN_SSIM, gate=None):
+    """Codifica con il livello richiesto; se il controllo qualità fallisce scende al livello di fallback.
+
+    Restituisce (livello usato, byte, secondi di codifica, superato il controllo). Con ok=False (controllo
+    fallito e nessun fallback) i byte non vanno salvati. Ogni uscita con perdita viene misurata; gate (TierGate)
+    serve solo a saltare i livelli già scartati su tutto il campione.
+    """
+    start = time.perf_counter()
+    while True:
+        conf = TIERS[tier]
+        lossless = conf.get('lossless')
+        if not lossless and conf.get('fallback') and gate is not None and gate.rejected(tier):
+            tier = conf['fallback']
+            continue
+        data = encode(img, tier)
+        if lossless:
+            return tier, data, time.perf_counter() - start, True
+        ok = passes(*quality(img, data), min_psnr, min_ssim)
+        if gate is not None:
+            gate.record(tier, ok)
+        if ok or not conf.get('fallback'):
+            return tier, data, time.perf_counter() - start, ok
+        tier = conf['fallback']
+
+# ==========================================
+# Statistiche
+# ==========================================
+
+class EncoderStats:
+    """Tempo di codifica e byte prodotti per livello, con i fallback del controllo qualità."""
+
+    def __init__(self):
+        self.tiers = {}
+
+    def add(self, tier, nbytes, seconds, requested=None, ok=True):
+        entry = self.tiers.setdefault(tier, {'count': 0, 'bytes': 0, 'seconds': 0.0, 'fallbacks': 0, 'rejected': 0})
+        entry['count'] += 1
+        entry['bytes'] += nbytes
+        entry['seconds'] += seconds
+        if requested and requested != tier:
+            entry['fallbacks'] += 1
+        if not ok:
+            entry['rejected'] += 1
+
+    def report(self):
+        lines = []
+        for tier, e in sorted(self.tiers.items()):
+            lines.append(f"  {tier}: {e['count']} immagini, {e['bytes'] / 1024:.0f} KB, "
+                         f"{e['seconds'] * 1000 / e['count']:.1f} ms/img, {e['fallbacks']} fallback, "
+                         f"{e['rejected']} sotto soglia")
+        return "\n".join(lines)
+
+
+def compare_tiers(images, tiers=None, min_psnr=MIN_PSNR, min_ssim=MIN_SSIM):
+    """Codifica le stesse immagini con ogni livello e misura tempo, byte risparmiati e qualità."""
+    tiers = tiers or available_tiers()
+    results = {}
+    for tier in tiers:
+        total_bytes, seconds, worst_psnr, worst_ssim = 0, 0.0, math.inf, 1.0
+        for img in images:
+            start = time.perf_counter()
+            data = encode(img, tier)
+            seconds += time.perf_counter() - start
+            total_bytes += len(data)
+            psnr, ssim = quality(img, data)
+            worst_psnr, worst_ssim = min(worst_psnr, psnr), min(worst_ssim, ssim)
+        results[tier] = {
+            'count': len(images),
+            'bytes': total_bytes,
+            'seconds': seconds,
+            'min_psnr': worst_psnr,
+            'min_ssim': worst_ssim,
+            'accepted': TIERS[tier].get('lossless', False) or passes(worst_psnr, worst_ssim, min_psnr, min_ssim),
+        }
+    return results
+
+
+def print_comparison(results, baseline=DEFAULT_TIER):
+    base = results.get(baseline, {}).get('bytes')
+    print(f"{'livello':<14} {'KB':>8} {'risparmio':>10} {'ms/img':>8} {'PSNR min':>9} {'SSIM min':>9}  accettato")
+    for tier, r in results.items():
+        saved = f"{100 * (1 - r['bytes'] / base):.1f}%" if base else "-"
+        psnr = "inf" if math.isinf(r['min_psnr']) else f"{r['min_psnr']:.1f}"
+        print(f"{tier:<14} {r['bytes'] / 1024:>8.0f} {saved:>10} {r['seconds'] * 1000 / max(r['count'], 1):>8.1f} "
+              f"{psnr:>9} {r['min_ssim']:>9.4f}  {'sì' if r['accepted'] else 'no'}")
+
+
+def main(argv=None):
+    from matchup import LEAGUES, MatchupRenderer, find_team_files, league_directory
+
+    parser = argparse.ArgumentParser(description="Confronta i livelli di codifica su un campione di matchup.")
+    parser.add_argument('league', nargs='?', default='seriea', choices=list(LEAGUES))
+    parser.add_argument('--sample', type=int, default=20, help="numero di matchup del campione")
+    parser.add_argument('--min-psnr', type=float, default=MIN_PSNR)
+    parser.add_argument('--min-ssim', type=float, default=MIN_SSIM)
+    args = parser.parse_args(argv)
+
+    conf = LEAGUES[args.league]
+    directory = league_directory(conf)
+    renderer = MatchupRenderer(directory, conf['center_logo'], conf['presets'])
+    teams = find_team_files(directory, {'image.png', conf['center_logo']})
+    pairs = [(a, b) for a in teams for b in teams if a != b][:args.sample]
+    images = [renderer.compose(a, b) for a, b in pairs]
+
+    results = compare_tiers(images, min_psnr=args.min_psnr, min_ssim=args.min_ssim)
+    print(f"Campione: {len(images)} matchup di {args.league} (soglie PSNR >= {args.min_psnr}, SSIM >= {args.min_ssim})")
+    print_comparison(results)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
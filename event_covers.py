@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+
+import instrument
+from asset_manifest import MANIFEST_PATH, AssetIndex
+
+# ==========================================
+# Configurazione
+# ==========================================
+MATCHUP_SUFFIX = '-matchup'
+
+# Nomi alternativi delle squadre (chiave = nome del file del logo squadra). Prefissi come FC/AC/SSC e
+# anni di fondazione vengono già ignorati dalla normalizzazione: qui vanno solo i nomi davvero diversi.
+TEAM_ALIASES = {
+    'inter': ['internazionale', 'internazionale milano', 'inter milan', 'inter milano'],
+    'juventus': ['juve'],
+    'verona': ['hellas verona', 'hellas'],
+    'napoli': ['naples'],
+    'torino': ['turin'],
+    'juvestabia': ['juve stabia'],
+    'sudtirol': ['suedtirol', 'sudtirol bolzano', 'alto adige'],
+    'entella': ['virtus entella'],
+    'sampdoria': ['samp'],
+    'spezia': ['la spezia'],
+    'venezia': ['venice'],
+    'padova': ['padua'],
+    'mantova': ['mantua'],
+}
+# Parole che non distinguono una squadra ("FC Internazionale", "US Sassuolo Calcio")
+STOPWORDS = frozenset({'fc', 'ac', 'as', 'ss', 'ssc', 'us', 'usc', 'acf', 'afc', 'cf', 'sc', 'bc', 'calcio'})
+
+# Logo di ripiego per categoria: la prima regola con tutte le parole presenti nel nome della categoria
+CATEGORY_LOGOS = (
+    (('am', 'football'), 'NFL'),
+    (('american', 'football'), 'NFL'),
+    (('nfl',), 'NFL'),
+    (('ice', 'hockey'), 'NHL'),
+    (('nhl',), 'NHL'),
+    (('basketball',), 'Basket'),
+    (('wnba',), 'Basket'),
+    (('nba',), 'Basket'),
+    (('baseball',), 'Baseball'),
+    (('mlb',), 'Baseball'),
+    (('softball',), 'Baseball'),
+    (('tennis',), 'Tennis'),
+    (('atp',), 'Tennis'),
+    (('wta',), 'Tennis'),
+    (('motogp',), 'MotoGP'),
+    (('moto', 'gp'), 'MotoGP'),
+    (('formula',), 'F1'),
+    (('f1',), 'F1'),
+    (('motorsport',), 'F1'),
+    (('boxing',), 'Boxing'),
+    (('ufc',), 'Boxing'),
+    (('darts',), 'Darts'),
+    (('wrestling',), 'Wrestling'),
+    (('wwe',), 'Wrestling'),
+    (('aew',), 'Wrestling'),
+    (('volleyball',), 'Pallavolo'),
+    (('soccer',), 'Soccer'),
+    (('futsal',), 'Soccer'),
+    (('friendly',), 'Soccer'),
+    (('mls',), 'Soccer'),
+    (('efl',), 'Soccer'),
+    (('usl',), 'Soccer'),
+    (('premiership',), 'Soccer'),
+)
+
+# "Italy - Serie A : Atalanta vs Inter (Round 3)": separatore delle squadre, contesto prima e dopo
+VS_RE = re.compile(r'\s+vs?\.?\s+', re.IGNORECASE)
+LEFT_CONTEXT_RE = re.compile(r'^.*(?::|\|| - )\s*')
+RIGHT_CONTEXT_RE = re.compile(r'\s*(?:\(|\[|\||,|:| - ).*$')
+
+
+def tokens(text):
+    """Parole normalizzate: senza accenti, minuscole, senza prefissi societari né numeri (anni di fondazione)."""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    return [t for t in re.findall(r'[a-z0-9]+', text) if t not in STOPWORDS and not t.isdigit()]
+
+
+def name_key(text):
+    return ' '.join(tokens(text))
+
+# ==========================================
+# Indice
+# ==========================================
+
+class CoverResolver:
+    """Titolo evento -> copertina della partita (o logo della categoria), con indici precalcolati.
+
+    Tutto viene da assets.json: nessuna scansione di cartelle durante la risoluzione. Ogni titolo costa
+    una normalizzazione e qualche ricerca in dizionario, qualunque sia il numero di copertine.
+    """
+
+    def __init__(self, assets):
+        self.aliases = {}  # nome normalizzato -> squadra (nome del file del logo)
+        self.pairs = {}  # (squadra, squadra) -> copertina, in entrambi gli ordini
+        self.category_logos = {}
+        for key in assets.keys():
+            namespace, _, name = key.partition('/')
+            if not namespace.endswith(MATCHUP_SUFFIX):
+                continue
+            home, sep, away = name.partition('-vs-')
+            if not sep:
+                continue
+            path = assets.path(key)
+            self.pairs[(home, away)] = path
+            self.pairs.setdefault((away, home), path)
+            for team in (home, away):
+                self._alias(team, team)
+                self._alias(team.replace('-', ' '), team)
+        for team, names in TEAM_ALIASES.items():
+            for name in names:
+                self._alias(name, team)
+        for _, logo in CATEGORY_LOGOS:
+            path = assets.path(f"logo/{logo}")
+            if path:
+                self.category_logos[logo] = path
+        self.matched = 0
+        self.fallback = 0
+        self.unresolved = 0
+
+    @classmethod
+    def load(cls, path=MANIFEST_PATH):
+        return cls(AssetIndex.load(path))
+
+    def _alias(self, name, team):
+        key = name_key(name)
+        if key:
+            self.aliases.setdefault(key, team)
+            self.aliases.setdefault(key.replace(' ', ''), team)
+
+    def team(self, text):
+        key = name_key(text)
+        return self.aliases.get(key) or self.aliases.get(key.replace(' ', ''))
+
+    def matchup(self, title):
+        """Copertina della partita per un titolo "Squadra vs Squadra", o None."""
+        sides = VS_RE.split(title, maxsplit=1)
+        if len(sides) != 2:
+            return None
+        home = self.team(LEFT_CONTEXT_RE.sub('', sides[0]))
+        away = self.team(RIGHT_CONTEXT_RE.sub('', sides[1])) if home else None
+        return self.pairs.get((home, away)) if away else None
+
+    def category_logo(self, category):
+        words = set(tokens(category))
+        for rule, logo in CATEGORY_LOGOS:
+            if words.issuperset(rule) and logo in self.category_logos:
+                return self.category_logos[logo]
+        return None
+
+    def resolve(self, title, category):
+        path = self.matchup(title)
+        if path:
+            self.matched += 1
+            return path
+        path = self.category_logo(category)
+        if path:
+            self.fallback += 1
+        else:
+            self.unresolved += 1
+        return path
+
+    def report(self):
+        return f"{self.matched} copertine partita, {self.fallback} loghi categoria, {self.unresolved} senza immagine"
+
+
+def attach_covers(data, resolver=None):
+    """Aggiunge 'image' (percorso nel repository) agli eventi per cui esiste una copertina o un logo."""
+    if resolver is None:
+        if not os.path.exists(MANIFEST_PATH):
+            print(f"AVVISO: {MANIFEST_PATH} non trovato, eventi senza immagini (python asset_manifest.py)")
+            return data
+        with instrument.stage('covers.index'):
+            resolver = CoverResolver.load()
+    with instrument.stage('covers'):
+        for categories in data.values():
+            for category, events in categories.items():
+                for event in events:
+                    path = resolver.resolve(event.get('event', ''), category)
+                    if path:
+                        event['image'] = path
+                    else:
+                        event.pop('image', None)
+    instrument.count('covers.matchup', resolver.matched)
+    instrument.count('covers.category', resolver.fallback)
+    instrument.count('covers.none', resolver.unresolved)
+    print(f"[SCHEDULE] Immagini eventi: {resolver.report()}")
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Associa a ogni evento della programmazione la copertina della partita o il logo della categoria.")
+    parser.add_argument('schedule', nargs='?', default='daddyliveSchedule.json')
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--output', help="scrive qui la programmazione con le immagini (altrimenti solo statistiche)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    resolver = CoverResolver.load(args.manifest)
+    loaded = time.perf_counter()
+    with open(args.schedule, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    attach_covers(data, resolver)
+    done = time.perf_counter()
+    print(f"Indice: {len(resolver.aliases)} nomi, {len(resolver.pairs)} coppie in {(loaded - start) * 1000:.0f} ms; "
+          f"risoluzione in {(done - loaded) * 1000:.0f} ms")
+    if args.output:
+        from schedule_output import write_schedule
+        write_schedule(data, os.path.abspath(args.output))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,75 +1,24 @@
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+import argparse
 import os
-import json
+import sys
 from datetime import datetime
 import re
-from bs4 import BeautifulSoup
+from schedule_parser import html_to_json as parse_schedule
+from schedule_output import write_schedule
+from event_covers import attach_covers
 import time
+import instrument
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+JSON_OUTPUT = os.path.join(SCRIPT_DIR, "daddyliveSchedule.json")
 
 def html_to_json(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    result = {}
-    
-    date_rows = soup.find_all('tr', class_='date-row')
-    if not date_rows:
-        print("AVVISO: Nessuna riga di data trovata nel contenuto HTML!")
-        return {}
-
-    current_date = None
-    current_category = None
-
-    for row in soup.find_all('tr'):
-        if 'date-row' in row.get('class', []):
-            current_date = row.find('strong').text.strip()
-            result[current_date] = {}
-            current_category = None
-
-        elif 'category-row' in row.get('class', []) and current_date:
-            current_category = row.find('strong').text.strip() + "</span>"
-            result[current_date][current_category] = []
-
-        elif 'event-row' in row.get('class', []) and current_date and current_category:
-            time_div = row.find('div', class_='event-time')
-            info_div = row.find('div', class_='event-info')
-
-            if not time_div or not info_div:
-                continue
-
-            time_strong = time_div.find('strong')
-            event_time = time_strong.text.strip() if time_strong else ""
-            event_info = info_div.text.strip()
-
-            event_data = {
-                "time": event_time,
-                "event": event_info,
-                "channels": []
-            }
-
-            # Cerca la riga dei canali successiva
-            next_row = row.find_next_sibling('tr')
-            if next_row and 'channel-row' in next_row.get('class', []):
-                channel_links = next_row.find_all('a', class_='channel-button-small')
-                for link in channel_links:
-                    href = link.get('href', '')
-                    channel_id_match = re.search(r'stream-(\d+)\.php', href)
-                    if channel_id_match:
-                        channel_id = channel_id_match.group(1)
-                        channel_name = link.text.strip()
-                        channel_name = re.sub(r'\s*\(CH-\d+\)$', '', channel_name)
-
-                        event_data["channels"].append({
-                            "channel_name": channel_name,
-                            "channel_id": channel_id
-                        })
-
-            result[current_date][current_category].append(event_data)
-
-    return result
-
-def modify_json_file(json_file_path):
-    with open(json_file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
+    """Converte il contenuto HTML (layout a tabella) in JSON organizzato per giorno / categoria / eventi."""
+    return parse_schedule(html_content, 'table')
+
+def normalise_dates(data):
+    """Riporta il mese corrente nelle chiavi data (es. "Monday 3rd 2025" -> "Monday 3rd June 2025")."""
+    data = dict(data)
     current_month = datetime.now().strftime("%B")
 
     for date in list(data.keys()):
@@ -81,18 +30,31 @@ def modify_json_file(json_file_path):
             new_date = f"{day_part}{suffix} {current_month} {year_part}"
             data[new_date] = data.pop(date)
 
-    with open(json_file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
-    
-    print(f"File JSON modificato e salvato in {json_file_path}")
+    return data
+
+def convert_schedule(html_content, json_output=JSON_OUTPUT):
+    """HTML della programmazione -> JSON su disco: normalizzazione e scrittura atomica in un solo passaggio
+    (saltata se il contenuto non cambia)."""
+    print("Conversione HTML in formato JSON...")
+    json_data = html_to_json(html_content)
+    write_schedule(json_data, json_output, normalise=lambda data: attach_covers(normalise_dates(data)))
+
+def schedule_from_html(path, json_output=JSON_OUTPUT):
+    """Modalità offline: rielabora una pagina già salvata, senza browser (Playwright non serve)."""
+    print(f"Pagina locale {path} -> {json_output}")
+    with instrument.stage('read'):
+        with open(path, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+    convert_schedule(html_content, json_output)
+    return True
+
+def extract_schedule_container(max_retries=3, retry_delay=5, json_output=JSON_OUTPUT):
+    # Playwright si importa solo qui: la conversione offline (--from-html) non lo carica
+    from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
-def extract_schedule_container(max_retries=3, retry_delay=5):
     # URL di partenza (con redirect)
     initial_url = "https://daddylive.sx/"
 
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    json_output = os.path.join(script_dir, "daddyliveSchedule.json")
-
     print(f"Accesso alla pagina {initial_url} (seguendo eventuali redirect)...")
 
     for attempt in range(1, max_retries + 1):
@@ -108,22 +70,25 @@ def extract_schedule_container(max_retries=3, retry_delay=5):
             try:
                 print("Navigazione alla pagina...")
                 # Playwright segue automaticamente i redirect
-                response = page.goto(initial_url, timeout=60000)
+                with instrument.stage('fetch'):
+                    response = page.goto(initial_url, timeout=60000)
                 
                 # Ottieni l'URL finale dopo eventuali redirect
                 final_url = page.url
                 print(f"URL finale dopo redirect: {final_url}")
                 
                 print("Attesa per il caricamento completo...")
-                page.wait_for_timeout(10000)  # 10 secondi
+                with instrument.stage('fetch'):
+                    page.wait_for_timeout(10000)  # 10 secondi
 
-                schedule_content = page.evaluate("""() => {
-                    const container = document.getElementById('main-schedule-container');
-                    return container ? container.outerHTML : '';
-                }""")
+                    schedule_content = page.evaluate("""() => {
+                        const container = document.getElementById('main-schedule-container');
+                        return container ? container.outerHTML : '';
+                    }""")
 
                 if not schedule_content:
                     print("AVVISO: main-schedule-container non trovato o vuoto!")
+                    instrument.fail('schedule', "main-schedule-container non trovato o vuoto", attempt=attempt)
                     if attempt < max_retries:
                         print(f"Attesa di {retry_delay} secondi prima del prossimo tentativo...")
                         browser.close()
@@ -133,20 +98,13 @@ def extract_schedule_container(max_retries=3, retry_delay=5):
                         continue
                     return False
 
-                print("Conversione HTML in formato JSON...")
-                json_data = html_to_json(schedule_content)
-
-                with open(json_output, "w", encoding="utf-8") as f:
-                    json.dump(json_data, f, indent=4)
-
-                print(f"Dati JSON salvati in {json_output}")
-
-                modify_json_file(json_output)
+                convert_schedule(schedule_content, json_output)
                 browser.close()
                 return True
 
             except PlaywrightTimeoutError as e:
                 print(f"ERRORE DI TIMEOUT: {str(e)}")
+                instrument.fail('schedule', e, attempt=attempt)
                 # Cattura uno screenshot in caso di errore per debug
                 try:
                     page.screenshot(path=f"error_screenshot_attempt_{attempt}.png")
@@ -167,6 +125,7 @@ def extract_schedule_container(max_retries=3, retry_delay=5):
                     
             except Exception as e:
                 print(f"ERRORE: {str(e)}")
+                instrument.fail('schedule', e, attempt=attempt)
                 # Cattura uno screenshot in caso di errore per debug
                 try:
                     page.screenshot(path=f"error_screenshot_attempt_{attempt}.png")
@@ -187,8 +146,21 @@ def extract_schedule_container(max_retries=3, retry_delay=5):
 
     return False
 
-if __name__ == "__main__":
-    success = extract_schedule_container()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estrae la programmazione da daddylive (Playwright) in daddyliveSchedule.json.")
+    parser.add_argument('--from-html', metavar='FILE', help="converte una pagina già salvata, senza rete né browser")
+    parser.add_argument('--output', default=JSON_OUTPUT, help="JSON della programmazione (default daddyliveSchedule.json)")
+    args = parser.parse_args(argv)
+
+    with instrument.run('extract') as report:
+        if args.from_html:
+            success = schedule_from_html(args.from_html, args.output)
+        else:
+            success = extract_schedule_container(json_output=args.output)
+        report.ok = success
     if not success:
         print("Errore durante l'estrazione dello schedule da daddylive.")
         exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,9 +1,10 @@
-import requests
+import argparse
 import os
-import json
-from datetime import datetime
-import re
-from bs4 import BeautifulSoup
+import sys
+import instrument
+from schedule_parser import html_to_json as parse_schedule
+from schedule_output import write_schedule
+from event_covers import attach_covers
 
 # ==========================================
 # Configurazione
@@ -22,83 +23,36 @@ FLARESOLVERR_URL = os.getenv("FLARESOLVERR_URL")
 
 def html_to_json(html_content):
     """Converte il contenuto HTML della programmazione in formato JSON organizzato per giorno / categoria / eventi."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    result = {}
-
-    # ATTENZIONE MANUTENZIONE:
-    # La prima versione di questo script aveva la regex dei link canale scritta come r'/watch\\.php\\?id=\\d+'.
-    # Essendo una raw string con backslash doppi, il pattern realizzato cercava letteralmente le sequenze "\\." e "\\?"
-    # e NON trovava i link reali "/watch.php?id=123" -> risultato: channels[] sempre vuoto.
-    # Ora il pattern corretto (usato più sotto) è r'/watch\.php\?id=\d+' (singolo livello di escape) così i channel_id vengono estratti.
-    # Se in futuro cambia la struttura degli href (es. query string diversa), aggiornare di conseguenza.
-
-    schedule_div = soup.find('div', id='schedule')
-    if not schedule_div:
-        print("AVVISO: Contenitore 'schedule' non trovato nel contenuto HTML!")
-        return {}
-
-    for day_div in schedule_div.find_all('div', class_='schedule__day'):
-        day_title_tag = day_div.find('div', class_='schedule__dayTitle')
-        if not day_title_tag:
-            continue
-        current_date = day_title_tag.text.strip()
-        result[current_date] = {}
-
-        for category_div in day_div.find_all('div', class_='schedule__category'):
-            cat_header = category_div.find('div', class_='schedule__catHeader')
-            if not cat_header:
-                continue
-            current_category = cat_header.text.strip()
-            result[current_date][current_category] = []
-
-            category_body = category_div.find('div', class_='schedule__categoryBody')
-            if not category_body:
-                continue
-
-            for event_div in category_body.find_all('div', class_='schedule__event'):
-                event_header = event_div.find('div', class_='schedule__eventHeader')
-                if not event_header:
-                    continue
-                time_span = event_header.find('span', class_='schedule__time')
-                event_title_span = event_header.find('span', class_='schedule__eventTitle')
-                event_data = {
-                    "time": time_span.text.strip() if time_span else "",
-                    "event": event_title_span.text.strip() if event_title_span else "Evento Sconosciuto",
-                    "channels": []
-                }
-                channels_div = event_div.find('div', class_='schedule__channels')
-                if channels_div:
-                    # NOTE: la regex precedente era doppiamente escape (r'/watch\\.php\\?id=\\d+') e non matchava l'href reale.
-                    # Corretto pattern: /watch\.php?id=123  (usando raw string singolo livello)
-                    for link in channels_div.find_all('a', href=re.compile(r'/watch\.php\?id=\d+')):
-                        href = link.get('href', '')
-                        channel_id_match = re.search(r'id=(\d+)', href)
-                        if channel_id_match:
-                            channel_id = channel_id_match.group(1)
-                            channel_name = link.text.strip()
-                            channel_name = re.sub(r'\\s*CH-\\d+$', '', channel_name).strip()
-                            event_data["channels"].append({
-                                "channel_name": channel_name,
-                                "channel_id": channel_id
-                            })
-                result[current_date][current_category].append(event_data)
-    return result
-
-
-def modify_json_file(json_file_path):
-    with open(json_file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    # Se servissero modifiche future alle chiavi data si possono inserire qui
-    with open(json_file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
-    print(f"File JSON normalizzato salvato in {json_file_path}")
+    # Parser condiviso (schedule_parser.py): lxml se installato, altrimenti BeautifulSoup
+    return parse_schedule(html_content, 'div')
+
+
+def convert_schedule(html_content, output=OUTPUT_SCHEDULE_JSON):
+    """HTML della programmazione -> JSON su disco (immagini degli eventi, scrittura atomica solo se cambia)."""
+    print("[SCHEDULE] Conversione HTML -> JSON...")
+    json_data = html_to_json(html_content)
+    write_schedule(json_data, output, normalise=attach_covers)
+
+
+def schedule_from_html(path, output=OUTPUT_SCHEDULE_JSON):
+    """Modalità offline: rielabora una pagina già salvata, senza FlareSolverr né rete."""
+    print(f"[SCHEDULE] Pagina locale {path} -> {output}")
+    with instrument.stage('read'):
+        with open(path, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+    convert_schedule(html_content, output)
+    return True
+
 
 # ==========================================
 # FlareSolverr
 # ==========================================
+# requests si importa alla prima richiesta: la conversione offline non lo carica
 
 def fetch_with_flaresolverr(url, max_timeout=60000):
     """Usa FlareSolverr per bypassare Cloudflare e ottenere l'HTML."""
+    import requests
+
     print(f"[FLARE] Richiesta a FlareSolverr per: {url}")
     
     payload = {
@@ -108,14 +62,17 @@ def fetch_with_flaresolverr(url, max_timeout=60000):
     }
     
     try:
-        response = requests.post(FLARESOLVERR_URL, json=payload, timeout=120)
-        response.raise_for_status()
-        data = response.json()
+        with instrument.stage('fetch'):
+            response = requests.post(FLARESOLVERR_URL, json=payload, timeout=120)
+            response.raise_for_status()
+            data = response.json()
+        instrument.count('fetch.requests')
         
         if data.get("status") == "ok":
             solution = data.get("solution", {})
             html_content = solution.get("response")
             print(f"[FLARE] ✓ Successo! HTML ricevuto ({len(html_content)} bytes)")
+            instrument.count('fetch.bytes', len(html_content))
             return html_content
         else:
             print(f"[FLARE] ✗ Errore: {data.get('message', 'Unknown error')}")
@@ -140,10 +97,12 @@ def fetch_247_channels_html():
             with open(OUTPUT_247_HTML, 'w', encoding='utf-8') as f:
                 f.write(html_content)
             print(f"[24/7] Salvato HTML in {OUTPUT_247_HTML} ({len(html_content)} bytes)")
+            instrument.count('247.bytesWritten', len(html_content))
             return True
             
         except Exception as e:
             print(f"[24/7] Errore tentativo {attempt}: {e}")
+            instrument.fail('247', e, attempt=attempt)
             if attempt < RETRIES:
                 print("[24/7] Retry...")
     
@@ -151,7 +110,7 @@ def fetch_247_channels_html():
     return False
 
 
-def extract_schedule_container():
+def extract_schedule_container(output=OUTPUT_SCHEDULE_JSON):
     """Usa FlareSolverr per ottenere lo schedule dalla homepage."""
     url = DLHD_BASE
     print(f"[SCHEDULE] Accesso alla pagina {url} tramite FlareSolverr...")
@@ -164,16 +123,12 @@ def extract_schedule_container():
             if not schedule_content or len(schedule_content) < 1000:
                 raise ValueError(f"HTML troppo corto: {len(schedule_content) if schedule_content else 0} bytes")
             
-            print("[SCHEDULE] Conversione HTML -> JSON...")
-            json_data = html_to_json(schedule_content)
-            with open(OUTPUT_SCHEDULE_JSON, "w", encoding="utf-8") as f:
-                json.dump(json_data, f, indent=4)
-            print(f"[SCHEDULE] Salvato JSON in {OUTPUT_SCHEDULE_JSON}")
-            modify_json_file(OUTPUT_SCHEDULE_JSON)
+            convert_schedule(schedule_content, output)
             return True
             
         except Exception as e:
             print(f"[SCHEDULE] Errore tentativo {attempt}: {e}")
+            instrument.fail('schedule', e, attempt=attempt)
             if attempt < RETRIES:
                 print("[SCHEDULE] Retry...")
     
@@ -183,12 +138,27 @@ def extract_schedule_container():
 # ==========================================
 # Main
 # ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scarica la programmazione e i canali 24/7 da DaddyLive tramite FlareSolverr.")
+    parser.add_argument('--from-html', metavar='FILE',
+                        help="converte una pagina già salvata: niente rete, la pagina 24/7 non viene scaricata")
+    parser.add_argument('--output', default=OUTPUT_SCHEDULE_JSON, help=f"JSON della programmazione (default {OUTPUT_SCHEDULE_JSON})")
+    args = parser.parse_args(argv)
+
+    with instrument.run('extractflare') as report:
+        if args.from_html:
+            report.ok = schedule_from_html(args.from_html, args.output)
+            return
+        ok_schedule = extract_schedule_container(args.output)
+        ok_247 = fetch_247_channels_html()
+        report.ok = ok_schedule and ok_247
+        if not ok_schedule:
+            print("AVVISO: schedule NON scaricato correttamente.")
+        if not ok_247:
+            print("AVVISO: 24/7 page NON scaricata correttamente.")
+        if ok_schedule and ok_247:
+            print("Completato senza errori critici.")
+
+
 if __name__ == "__main__":
-    ok_schedule = extract_schedule_container()
-    ok_247 = fetch_247_channels_html()
-    if not ok_schedule:
-        print("AVVISO: schedule NON scaricato correttamente.")
-    if not ok_247:
-        print("AVVISO: 24/7 page NON scaricata correttamente.")
-    if ok_schedule and ok_247:
-        print("Completato senza errori critici.")
+    main(sys.argv[1:])
@@ -0,0 +1,223 @@
+import queue
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from http_cache import HTTPError
+
+# ==========================================
+# Configurazione
+# ==========================================
+MAX_WORKERS = 16
+MAX_PENDING = 256  # URL letti in anticipo dall'input (in coda o in download)
+HOST_RATE = 4.0  # richieste al secondo per host
+HOST_BURST = 4
+HOST_CONCURRENCY = 4
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRY_AFTER_MAX = 300.0
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Host che limitano in modo aggressivo (upload.wikimedia.org risponde 429 oltre poche richieste al secondo)
+HOST_LIMITS = {
+    'upload.wikimedia.org': {'rate': 1.0, 'burst': 2, 'concurrency': 2},
+}
+
+
+def retry_after_seconds(headers, now=None):
+    """Valore di Retry-After in secondi (intero o data HTTP), None se assente o non valido."""
+    value = (headers or {}).get('Retry-After')
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(float(value), RETRY_AFTER_MAX)
+    try:
+        delay = parsedate_to_datetime(value).timestamp() - (now or time.time())
+    except (TypeError, ValueError):
+        return None
+    return min(max(delay, 0.0), RETRY_AFTER_MAX)
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX, rng=random):
+    """Backoff esponenziale con jitter completo: uniforme in [0, min(cap, base * 2^attempt)]."""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+# ==========================================
+# Stato per host
+# ==========================================
+
+class HostState:
+    """Token bucket, richieste in corso e blocco temporaneo (dopo un 429) di un singolo host."""
+
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST, concurrency=HOST_CONCURRENCY):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.active = 0
+        self.pending = deque()
+        self.throttled = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_in(self, now):
+        """Secondi prima di poter avviare un'altra richiesta (0 = subito, None = limite di concorrenza)."""
+        if self.active >= self.concurrency:
+            return None
+        self._refill(now)
+        wait = max(self.blocked_until - now, 0.0)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self):
+        self.tokens -= 1
+        self.active += 1
+
+    def throttle(self, delay, now):
+        # Dimezza il ritmo una volta per episodio (i 429 delle richieste già in volo non contano) e sospende l'host
+        self.throttled += 1
+        if now >= self.blocked_until:
+            self.rate = max(self.rate / 2, self.max_rate / 8)
+        self.tokens = min(self.tokens, 0.0)
+        self.blocked_until = max(self.blocked_until, now + delay)
+
+    def recover(self):
+        self.rate = min(self.max_rate, self.rate + 0.1 * self.max_rate)
+
+# ==========================================
+# Scheduler
+# ==========================================
+
+class FetchScheduler:
+    """Scarica molti URL in parallelo rispettando i limiti di ogni host.
+
+    Un host rallentato (429/503) viene sospeso per il Retry-After o per un backoff con jitter,
+    mentre i worker continuano a servire gli altri host.
+    """
+
+    def __init__(self, fetch, max_workers=MAX_WORKERS, host_limits=None, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, rng=None, max_pending=MAX_PENDING):
+        self.fetch = fetch
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self.host_limits = {**HOST_LIMITS, **(host_limits or {})}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.rng = rng or random.Random()
+        self.hosts = {}
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'failed': 0}
+
+    def _host(self, url):
+        name = urlsplit(url).netloc.lower()
+        if name not in self.hosts:
+            self.hosts[name] = HostState(**self.host_limits.get(name, {}))
+        return self.hosts[name]
+
+    def _retry_delay(self, error, attempt):
+        """Attesa prima di ritentare, o None se l'errore è definitivo."""
+        if attempt >= self.max_retries:
+            return None
+        if isinstance(error, HTTPError):
+            if error.status not in RETRY_STATUSES:
+                return None
+            after = retry_after_seconds(error.headers)
+            if after is not None:
+                return after
+        elif not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return None
+        return backoff_delay(attempt, self.backoff_base, rng=self.rng)
+
+    def run(self, urls):
+        """Genera (url, dati, errore) man mano che i download terminano (ordine di completamento).
+
+        urls può essere un generatore: viene letto solo finché ci sono meno di max_pending URL in sospeso,
+        così la memoria non dipende dalla lunghezza dell'input. Un URL già in sospeso non viene riaccodato.
+        """
+        urls = iter(urls)
+        exhausted = False
+        active = set()
+        done = queue.Queue()
+
+        def task(url, attempt):
+            try:
+                done.put((url, attempt, self.fetch(url), None))
+            except Exception as e:
+                done.put((url, attempt, None, e))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = 0
+            while True:
+                while not exhausted and len(active) < self.max_pending:
+                    url = next(urls, None)
+                    if url is None:
+                        exhausted = True
+                    elif url not in active:
+                        active.add(url)
+                        self._host(url).pending.append((url, 0))
+                if not active:
+                    break
+
+                # Avvia tutte le richieste consentite ora; calcola quanto attendere per la prossima
+                now = time.monotonic()
+                wait = None
+                for host in self.hosts.values():
+                    while host.pending and running < self.max_workers:
+                        delay = host.ready_in(now)
+                        if delay is None:
+                            break
+                        if delay > 0:
+                            wait = delay if wait is None else min(wait, delay)
+                            break
+                        url, attempt = host.pending.popleft()
+                        host.take()
+                        running += 1
+                        self.stats['requests'] += 1
+                        pool.submit(task, url, attempt)
+
+                try:
+                    url, attempt, data, error = done.get(timeout=wait)
+                except queue.Empty:
+                    continue
+                running -= 1
+                host = self._host(url)
+                host.active -= 1
+                if error is None:
+                    host.recover()
+                    active.discard(url)
+                    yield url, data, None
+                    continue
+
+                delay = self._retry_delay(error, attempt)
+                if delay is None:
+                    self.stats['failed'] += 1
+                    active.discard(url)
+                    yield url, None, error
+                    continue
+                if isinstance(error, HTTPError) and error.status == 429:
+                    self.stats['throttled'] += 1
+                    host.throttle(delay, time.monotonic())
+                else:
+                    host.blocked_until = max(host.blocked_until, time.monotonic() + delay)
+                self.stats['retries'] += 1
+                host.pending.append((url, attempt + 1))
+
+    def report(self):
+        throttled = {name: h.throttled for name, h in self.hosts.items() if h.throttled}
+        line = (f"{self.stats['requests']} richieste, {self.stats['retries']} ritentativi, "
+                f"{self.stats['throttled']} risposte 429, {self.stats['failed']} falliti")
+        if throttled:
+            line += " (host rallentati: " + ", ".join(f"{n} x{c}" for n, c in sorted(throttled.items())) + ")"
+        return line
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ==========================================
+# Configurazione
+# ==========================================
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(ROOT_DIR, '.cache', 'http')
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0 Safari/537.36"
+TIMEOUT = 30
+
+
+class HTTPError(Exception):
+    """Risposta HTTP non valida; il messaggio ha la forma 'HTTP 429' come nei report delle copertine."""
+
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.headers = headers or {}
+
+
+def make_session(pool_size=16):
+    """Sessione requests con connessioni keep-alive riusate (pool per host)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+class HTTPCache:
+    """Cache su disco delle risposte: rivalida con ETag/Last-Modified e su 304 riusa il corpo salvato."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, session=None):
+        self.cache_dir = cache_dir
+        self.session = session or make_session()
+        self.stats = {'downloaded': 0, 'not_modified': 0, 'bytes': 0}
+        self._lock = threading.Lock()  # fetch() può essere chiamato da più thread
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.body", f"{base}.json"
+
+    def cached(self, url):
+        """Corpo in cache (senza rivalidare), o None."""
+        body_path, _ = self._paths(url)
+        if os.path.exists(body_path):
+            with open(body_path, 'rb') as f:
+                return f.read()
+        return None
+
+    def fetch(self, url, timeout=TIMEOUT):
+        body_path, meta_path = self._paths(url)
+        headers = {}
+        meta = {}
+        if os.path.exists(meta_path) and os.path.exists(body_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and meta:
+            with self._lock:
+                self.stats['not_modified'] += 1
+            return self.cached(url)
+        if response.status_code != 200:
+            raise HTTPError(response.status_code, response.headers)
+
+        data = response.content
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        with open(f"{body_path}.tmp", 'wb') as f:
+            f.write(data)
+        os.replace(f"{body_path}.tmp", body_path)
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+        }
+        with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        with self._lock:
+            self.stats['downloaded'] += 1
+            self.stats['bytes'] += len(data)
+        return data
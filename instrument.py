@@ -0,0 +1,181 @@
+import contextlib
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from build_manifest import write_json_atomic
+
+# ==========================================
+# Configurazione
+# ==========================================
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Report in .cache/run-reports/<script>.json; si cambia con LOGO_REPORT_DIR (es. per caricarli come artifact)
+DEFAULT_REPORT_DIR = os.path.join(ROOT_DIR, '.cache', 'run-reports')
+REPORT_DIR_ENV = 'LOGO_REPORT_DIR'
+# Profilazione a richiesta, senza toccare il codice: LOGO_PROFILE=1 (cProfile), LOGO_TRACEMALLOC=1 (allocazioni)
+PROFILE_ENV = 'LOGO_PROFILE'
+TRACEMALLOC_ENV = 'LOGO_TRACEMALLOC'
+PROFILE_TOP = 25
+TRACEMALLOC_TOP = 10
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def peak_rss_kb():
+    """Picco di memoria residente del processo in KB (None dove il modulo resource non esiste, es. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def _enabled(name):
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
+
+# ==========================================
+# Report di esecuzione
+# ==========================================
+
+class RunReport:
+    """Tempi per fase, contatori ed errori di un'esecuzione, salvati in JSON alla fine (come generation-report.json).
+
+    Le fasi possono essere annidate: ognuna misura il proprio tempo reale, quindi i tempi non si sommano.
+    """
+
+    def __init__(self, script, report_dir=None, profile=None, trace_memory=None):
+        self.report_dir = report_dir or os.environ.get(REPORT_DIR_ENV) or DEFAULT_REPORT_DIR
+        self.path = os.path.join(self.report_dir, f"{script}.json")
+        self.header = {
+            'generatedAt': utc_now(),
+            'script': script,
+            'argv': sys.argv[1:],
+            'python': sys.version.split()[0],
+        }
+        self.stages = {}
+        self.counters = {}
+        self.failures = []
+        self.ok = True  # lo script lo mette a False se l'esecuzione non ha prodotto il risultato
+        self._start = time.perf_counter()
+        self._profiler = None
+        self._trace_memory = _enabled(TRACEMALLOC_ENV) if trace_memory is None else trace_memory
+        if _enabled(PROFILE_ENV) if profile is None else profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if self._trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            entry['seconds'] += time.perf_counter() - start
+            entry['calls'] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def fail(self, stage, error, **context):
+        self.failures.append({'stage': stage, 'error': str(error), **context})
+
+    def _profile(self):
+        import pstats
+        self._profiler.disable()
+        os.makedirs(self.report_dir, exist_ok=True)
+        prof_path = os.path.splitext(self.path)[0] + '.prof'
+        self._profiler.dump_stats(prof_path)
+        stats = pstats.Stats(self._profiler).stats
+        top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+        return {
+            'file': prof_path,
+            'top': [{'function': f"{os.path.relpath(path, ROOT_DIR) if path.startswith(ROOT_DIR) else path}:{line}({name})",
+                     'calls': nc, 'totalSeconds': round(tt, 4), 'cumulativeSeconds': round(ct, 4)}
+                    for (path, line, name), (_, nc, tt, ct, _) in top],
+        }
+
+    def _tracemalloc(self):
+        import tracemalloc
+        _, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics('lineno')[:TRACEMALLOC_TOP]
+        tracemalloc.stop()
+        return {
+            'peakKb': peak // 1024,
+            'top': [{'line': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                     'kb': stat.size // 1024, 'blocks': stat.count} for stat in top],
+        }
+
+    def close(self, **extra):
+        """Scrive il report finale e ne stampa un riassunto su una riga."""
+        report = {
+            **self.header,
+            'ok': self.ok,
+            'wallSeconds': round(time.perf_counter() - self._start, 3),
+            'peakRssKb': peak_rss_kb(),
+            'stages': {name: {'seconds': round(e['seconds'], 3), 'calls': e['calls']} for name, e in self.stages.items()},
+            'counters': self.counters,
+            **extra,
+        }
+        if self._profiler is not None:
+            report['profile'] = self._profile()
+        if self._trace_memory:
+            report['tracemalloc'] = self._tracemalloc()
+        report['failures'] = self.failures
+        os.makedirs(self.report_dir, exist_ok=True)
+        write_json_atomic(self.path, report, indent=2, ensure_ascii=False)
+        stages = ', '.join(f"{name} {e['seconds']:.2f}s" for name, e in report['stages'].items())
+        print(f"[REPORT] {report['script']}: {report['wallSeconds']:.2f}s ({stages or 'nessuna fase'}), "
+              f"picco RSS {report['peakRssKb']} KB, {len(self.failures)} errori -> {self.path}")
+        return report
+
+# ==========================================
+# Esecuzione corrente
+# ==========================================
+# I moduli condivisi (parser, scrittura della programmazione, matchup) registrano fasi e contatori
+# nell'esecuzione attiva, se c'è; senza run() le chiamate non fanno nulla.
+
+_active = None
+
+
+@contextlib.contextmanager
+def run(script, **kwargs):
+    """Esecuzione instrumentata di uno script: il report viene scritto anche se lo script fallisce o esce."""
+    global _active
+    report = _active = RunReport(script, **kwargs)
+    try:
+        yield report
+    except SystemExit as e:
+        report.ok = report.ok and not e.code
+        report.close()
+        raise
+    except BaseException as e:
+        report.ok = False
+        report.fail('run', repr(e))
+        report.close()
+        raise
+    else:
+        report.close()
+    finally:
+        _active = None
+
+
+def stage(name):
+    return _active.stage(name) if _active is not None else contextlib.nullcontext()
+
+
+def count(name, n=1):
+    if _active is not None:
+        _active.count(name, n)
+
+
+def fail(stage_name, error, **context):
+    if _active is not None:
+        _active.fail(stage_name, error, **context)
@@ -0,0 +1,579 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from PIL import Image
+from itertools import permutations
+
+import instrument
+from build_manifest import BuildManifest, params_key
+from encoders import (DEFAULT_TIER, EncoderStats, TierGate, alpha_tiers, encode_gated, output_pixel_hash, tier_ext,
+                      write_if_changed)
+from sources import RasterCache, open_logo
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_NAME = '.matchup-manifest.json'
+# Fasi cronometrate dentro ogni lavoro (anche nei worker) e riportate come contatori matchup.<fase>Seconds;
+# la codifica ha il suo contatore (matchup.encodeSeconds) dalle statistiche dei livelli
+TIMED_STAGES = ('decode', 'resize', 'composite', 'write')
+
+# ==========================================
+# Registro dei campionati
+# ==========================================
+# Ogni campionato: cartella dei loghi squadra, logo centrale (relativo alla cartella, es. '../Liga.png')
+# e uno o più preset di uscita. Il primo preset scrive nella cartella del campionato, gli altri
+# nella sottocartella indicata da 'subdir'. Per aggiungere Premier League, Liga, Bundesliga... basta
+# una nuova voce con la cartella dei loghi squadra.
+LEAGUES = {
+    'seriea': {
+        'directory': 'SerieA',
+        'center_logo': 'seriea.png',
+        'presets': [{'name': 'default', 'width': 640, 'height': 360, 'center_size': 110}],
+    },
+    'serieb': {
+        'directory': 'SerieB',
+        'center_logo': 'serieb.png',
+        'presets': [{'name': 'default', 'width': 348, 'height': 182, 'center_size': 70}],
+    },
+}
+
+# ==========================================
+# Cache dei loghi squadra
+# ==========================================
+
+class TileCache:
+    """Cache in memoria dei loghi decodificati, ridimensionati e premoltiplicati (una decodifica per file)."""
+
+    def __init__(self, raster_cache=None):
+        self.raster_cache = raster_cache or RasterCache()
+        self._tiles = {}
+        self._levels = {}
+        # Il lock protegge solo ricerca e inserimento: decodifica e ridimensionamento avvengono fuori, così
+        # più thread (matchup_server.py) lavorano in parallelo; al peggio un logo viene decodificato due volte
+        self._lock = threading.Lock()
+        self.decodes = 0
+        self.resizes = 0
+        self.hits = 0
+        self.seconds = {'decode': 0.0, 'resize': 0.0}
+
+    def _build_levels(self, path, sizes, resample):
+        # Piramide: ogni livello si ricava dal più piccolo livello che lo contiene, non dall'originale.
+        # L'ordine è fisso (dal più grande) così il risultato non dipende dall'ordine delle richieste.
+        # Gli SVG vengono rasterizzati (con cache su disco) alla misura più grande della piramide
+        # Restituisce anche i secondi di decodifica e di ridimensionamento (per il benchmark)
+        start = time.perf_counter()
+        img = open_logo(path, max(sizes, key=lambda s: (s[0] * s[1], s)), self.raster_cache)
+        img.load()
+        decoded = time.perf_counter()
+        levels = {}
+        for size in sorted(set(sizes), key=lambda s: (s[0] * s[1], s), reverse=True):
+            parents = [s for s in levels if s[0] >= size[0] and s[1] >= size[1]]
+            source = levels[min(parents, key=lambda s: (s[0] * s[1], s))] if parents else img
+            levels[size] = source.resize(size, resample)
+        return levels, decoded - start, time.perf_counter() - decoded
+
+    def seed(self, path, levels, resample=Image.LANCZOS):
+        """Registra livelli già ridimensionati (es. letti da un atlas) senza decodificare il file."""
+        chain = tuple(sorted(levels))
+        with self._lock:
+            self._levels[(os.path.abspath(path), resample, chain)] = dict(levels)
+
+    def get(self, path, size, resample=Image.LANCZOS, premultiply=True, pyramid=()):
+        """Tile di dimensione size; pyramid elenca le altre dimensioni dello stesso logo da ricavare insieme."""
+        size = tuple(size)
+        chain = tuple(sorted({size, *map(tuple, pyramid)}))
+        key = (os.path.abspath(path), size, resample, premultiply, chain)
+        level_key = (os.path.abspath(path), resample, chain)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self.hits += 1
+                return tile
+            levels = self._levels.get(level_key)
+
+        if levels is None:
+            levels, decode_seconds, resize_seconds = self._build_levels(path, chain, resample)
+            with self._lock:
+                self.decodes += 1
+                self.resizes += len(levels)
+                self.seconds['decode'] += decode_seconds
+                self.seconds['resize'] += resize_seconds
+                levels = self._levels.setdefault(level_key, levels)
+        img = levels[size]
+        if premultiply:
+            img = premultiply_tile(img)
+        with self._lock:
+            return self._tiles.setdefault(key, img)
+
+    def report(self):
+        return (f"Cache loghi: {len(self._tiles)} tile, {self.decodes} decodifiche, "
+                f"{self.resizes} ridimensionamenti, {self.hits} decodifiche/ridimensionamenti evitati")
+
+
+def premultiply_tile(img):
+    """Incolla il logo (con la sua alpha) su una tela trasparente: equivale al primo paste del compositing."""
+    tile = Image.new('RGBA', img.size)
+    tile.paste(img, (0, 0), img)
+    return tile
+
+# ==========================================
+# Compositing
+# ==========================================
+
+def find_team_files(directory, exclude):
+    """Restituisce i loghi squadra della cartella (esclusi logo centrale e matchup già generati).
+
+    Un logo solo vettoriale (.svg) è accettato se non esiste la versione .png con lo stesso nome.
+    """
+    files = [f for f in os.listdir(directory) if f not in exclude and '_vs_' not in f]
+    pngs = {os.path.splitext(f)[0] for f in files if f.endswith('.png')}
+    return sorted(
+        f for f in files
+        if f.endswith('.png') or (f.endswith('.svg') and os.path.splitext(f)[0] not in pngs)
+    )
+
+
+def matchup_name(team1, team2):
+    return f"{os.path.splitext(team1)[0]}_vs_{os.path.splitext(team2)[0]}.png"
+
+
+def preset_encoder(preset):
+    return preset.get('encoder', DEFAULT_TIER)
+
+
+def preset_output(preset, name):
+    """Percorso del matchup relativo alla cartella del campionato (estensione data dal livello di codifica)."""
+    name = os.path.splitext(name)[0] + tier_ext(preset_encoder(preset))
+    subdir = preset.get('subdir')
+    return f"{subdir}/{name}" if subdir else name
+
+
+def tile_size(preset):
+    return (preset['width'] // 2, preset['height'])
+
+
+def pyramids(presets):
+    """Dimensioni di tile e logo centrale di tutti i preset (la catena usata dalla piramide)."""
+    return tuple(tile_size(p) for p in presets), tuple((p['center_size'], p['center_size']) for p in presets)
+
+
+def compose_matchup(tile1, tile2, center_img, width, height, center_size):
+    """Compone squadra di casa (sinistra), ospite (destra) e logo del campionato al centro."""
+    combined = Image.new('RGBA', (width, height))
+
+    # Le due metà non si sovrappongono: i tile premoltiplicati si copiano senza maschera
+    combined.paste(tile1, (0, 0))
+    combined.paste(tile2, (width // 2, 0))
+
+    x_center = (width - center_size) // 2
+    y_center = (height - center_size) // 2
+    combined.paste(center_img, (x_center, y_center), center_img)
+    return combined
+
+
+def compose_row(tile1, tiles2, center_img, width, height, center_size):
+    """Versione vettoriale di compose_matchup: tutti i matchup di una squadra di casa in un unico array.
+
+    Metà sinistra e logo centrale sono uguali per tutta la riga: la metà destra arriva da uno stack dei tile
+    ospiti e la fusione del centro (stessa aritmetica intera di Image.paste con maschera) è calcolata una
+    volta per tutto il batch. Restituisce un array uint8 (n, height, width, 4).
+    """
+    import numpy as np
+    half = width // 2
+    frames = np.empty((len(tiles2), height, width, 4), dtype=np.uint8)
+    frames[:, :, :half] = np.asarray(tile1)
+    for frame, tile in zip(frames, tiles2):
+        frame[:, half:2 * half] = tile
+    frames[:, :, 2 * half:] = 0  # colonna vuota se la larghezza è dispari
+
+    x_center = (width - center_size) // 2
+    y_center = (height - center_size) // 2
+    src = np.asarray(center_img, dtype=np.uint16)
+    alpha = np.repeat(src[..., 3:4], 4, axis=-1)
+    # BLEND di Paste.c: (dst * (255 - a) + src * a) / 255 arrotondato; il termine src * a è comune a tutto il batch
+    shared = src * alpha + 128
+    region = frames[:, y_center:y_center + center_size, x_center:x_center + center_size]
+    tmp = np.multiply(region, 255 - alpha, dtype=np.uint16)
+    tmp += shared
+    tmp += tmp >> 8
+    tmp >>= 8
+    region[...] = tmp
+    return frames
+
+
+class MatchupRenderer:
+    """Compone e salva i matchup di un campionato (tutti i preset) usando una TileCache propria."""
+
+    def __init__(self, directory, center_logo, presets, cache=None, pixels=None):
+        self.directory = directory
+        self.pixels = pixels or {}  # output -> hash dei pixel già salvati (dal manifest)
+        self.center_logo = os.path.join(directory, center_logo)
+        self.presets = {p['name']: p for p in presets}
+        self.cache = cache or TileCache()
+        self.tile_pyramid, self.center_pyramid = pyramids(presets)
+        # Livelli con perdita: ogni immagine è misurata, quelli scartati su tutto il campione passano al fallback
+        self.gate = TierGate()
+        self._arrays = {}
+        self.seconds = {'composite': 0.0, 'write': 0.0}
+
+    def timings(self):
+        """Secondi accumulati per fase: decodifica e ridimensionamento (TileCache), compositing e scrittura."""
+        return {**self.cache.seconds, **self.seconds}
+
+    def compose(self, team1, team2, preset_name=None):
+        preset = self.presets[preset_name] if preset_name else next(iter(self.presets.values()))
+        size = tile_size(preset)
+        center_size = preset['center_size']
+        # Carica l'immagine centrale
+        center_img = self.cache.get(self.center_logo, (center_size, center_size), premultiply=False,
+                                    pyramid=self.center_pyramid)
+        tile1 = self.cache.get(os.path.join(self.directory, team1), size, pyramid=self.tile_pyramid)
+        tile2 = self.cache.get(os.path.join(self.directory, team2), size, pyramid=self.tile_pyramid)
+        start = time.perf_counter()
+        img = compose_matchup(tile1, tile2, center_img, preset['width'], preset['height'], center_size)
+        self.seconds['composite'] += time.perf_counter() - start
+        return img
+
+    def encode(self, team1, team2, preset_name=None):
+        preset = self.presets[preset_name] if preset_name else next(iter(self.presets.values()))
+        return encode_gated(self.compose(team1, team2, preset['name']), preset_encoder(preset), gate=self.gate)
+
+    def render_bytes(self, team1, team2, preset_name=None):
+        """Restituisce il matchup codificato in memoria (stessi pixel del file salvato da render)."""
+        tier, data, _, ok = self.encode(team1, team2, preset_name)
+        if not ok:
+            raise ValueError(f"{team1} vs {team2}: il livello {tier} non supera il controllo qualità")
+        return data
+
+    def _tile_array(self, team, size):
+        # np.asarray di un'immagine Pillow copia i pixel: l'array si tiene accanto al tile
+        key = (team, size)
+        arr = self._arrays.get(key)
+        if arr is None:
+            import numpy as np
+            tile = self.cache.get(os.path.join(self.directory, team), size, pyramid=self.tile_pyramid)
+            arr = self._arrays[key] = np.asarray(tile)
+        return arr
+
+    def compose_row(self, team1, opponents, preset_name=None):
+        """Genera (squadra ospite, immagine) per tutti gli avversari di team1 con un solo compositing vettoriale."""
+        preset = self.presets[preset_name] if preset_name else next(iter(self.presets.values()))
+        size = tile_size(preset)
+        center_size = preset['center_size']
+        center_img = self.cache.get(self.center_logo, (center_size, center_size), premultiply=False,
+                                    pyramid=self.center_pyramid)
+        tile1 = self.cache.get(os.path.join(self.directory, team1), size, pyramid=self.tile_pyramid)
+        tiles2 = [self._tile_array(t, size) for t in opponents]
+        start = time.perf_counter()
+        frames = compose_row(tile1, tiles2, center_img, preset['width'], preset['height'], center_size)
+        self.seconds['composite'] += time.perf_counter() - start
+        for team2, frame in zip(opponents, frames):
+            yield team2, Image.fromarray(frame, 'RGBA')
+
+    def save(self, img, preset, name):
+        """Codifica con il livello del preset (default PNG ottimizzato) e salva, solo se i pixel sono cambiati.
+
+        Restituisce ((output, hash dei pixel, scritto), statistiche di codifica). Un'immagine che non supera il
+        controllo qualità (livello senza fallback) non viene salvata: hash dei pixel None.
+        """
+        tier, data, seconds, ok = encode_gated(img, preset_encoder(preset), gate=self.gate)
+        output = preset_output(preset, name)
+        pixels, written = None, False
+        if ok:
+            pixels = output_pixel_hash(img, tier, data)
+            start = time.perf_counter()
+            written = write_if_changed(os.path.join(self.directory, output), data, pixels, self.pixels.get(output))
+            self.seconds['write'] += time.perf_counter() - start
+        return (output, pixels, written), (tier, len(data), seconds, preset_encoder(preset), ok)
+
+    def render_row(self, job):
+        """Come render, ma per una riga (team1, ((team2, preset), ...)): un batch per preset."""
+        team1, matches = job
+        start = time.perf_counter()
+        before = self.timings()
+        outputs, encodes = [], []
+        for preset_name, preset in self.presets.items():
+            opponents = [team2 for team2, preset_names in matches if preset_name in preset_names]
+            if not opponents:
+                continue
+            for team2, img in self.compose_row(team1, opponents, preset_name):
+                output, encoded = self.save(img, preset, matchup_name(team1, team2))
+                outputs.append(output)
+                encodes.append(encoded)
+        return os.getpid(), outputs, time.perf_counter() - start, encodes, self._timings_since(before)
+
+    def render(self, job):
+        if len(job) == 2:
+            return self.render_row(job)
+        team1, team2, preset_names = job
+        name = matchup_name(team1, team2)
+        start = time.perf_counter()
+        before = self.timings()
+        outputs, encodes = [], []
+        for preset_name in preset_names:
+            output, encoded = self.save(self.compose(team1, team2, preset_name), self.presets[preset_name], name)
+            outputs.append(output)
+            encodes.append(encoded)
+        return os.getpid(), outputs, time.perf_counter() - start, encodes, self._timings_since(before)
+
+    def _timings_since(self, before):
+        # Secondi per fase di un solo lavoro: tornano al processo principale anche dai worker del pool
+        return {name: seconds - before[name] for name, seconds in self.timings().items()}
+
+# ==========================================
+# Pool di processi
+# ==========================================
+
+_worker_renderer = None
+
+
+def _init_worker(params, pixels):
+    # Ogni worker tiene la sua cache: ogni logo viene decodificato una sola volta per processo
+    global _worker_renderer
+    _worker_renderer = MatchupRenderer(*params, pixels=pixels)
+
+
+def _render_in_worker(job):
+    return _worker_renderer.render(job)
+
+
+def _render_parallel(jobs_list, params, pixels, jobs, chunksize):
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(params, pixels)) as pool:
+        yield from pool.imap_unordered(_render_in_worker, jobs_list, chunksize=chunksize)
+
+
+def group_rows(jobs_list):
+    """Raggruppa i lavori (team1, team2, preset) per squadra di casa: un lavoro per riga del calendario."""
+    rows = {}
+    for team1, team2, preset_names in jobs_list:
+        rows.setdefault(team1, []).append((team2, preset_names))
+    return [(team1, tuple(matches)) for team1, matches in rows.items()]
+
+
+def print_worker_summary(stats, wall):
+    total = sum(count for count, _ in stats.values())
+    for pid, (count, busy) in sorted(stats.items()):
+        rate = count / busy if busy else 0.0
+        print(f"  Worker {pid}: {count} matchup in {busy:.2f}s ({rate:.1f} img/s)")
+    rate = total / wall if wall else 0.0
+    print(f"Totale: {total} matchup in {wall:.2f}s ({rate:.1f} img/s, {len(stats)} worker)")
+
+# ==========================================
+# Build incrementale
+# ==========================================
+
+def render_params(preset, presets=None):
+    """Parametri che entrano nella chiave di ogni matchup (cambiandoli si rigenera tutto)."""
+    params = {'width': preset['width'], 'height': preset['height'], 'center_size': preset['center_size'],
+              'format': preset_encoder(preset)}
+    if presets and len(presets) > 1:
+        # Con più preset i tile derivano dalla piramide: la catena fa parte della chiave
+        params['pyramid'] = pyramids(presets)
+    return params
+
+
+def plan_league(directory, team_hashes, center_hash, presets, manifest, force=False):
+    """Confronta gli hash degli input con il manifest: restituisce i lavori da eseguire e le chiavi degli output."""
+    params = {p['name']: render_params(p, presets) for p in presets}
+
+    jobs_list, keys, adopted = [], {}, 0
+    for team1, team2 in permutations(sorted(team_hashes), 2):
+        name = matchup_name(team1, team2)
+        stale = []
+        for preset in presets:
+            output = preset_output(preset, name)
+            key = params_key(params[preset['name']], center_hash, team_hashes[team1], team_hashes[team2])
+            keys[output] = key
+            path = os.path.join(directory, output)
+            if force:
+                stale.append(preset['name'])
+            elif manifest.is_fresh(output, key, path):
+                continue
+            elif not manifest.existed and os.path.exists(path):
+                # Primo avvio senza manifest: i matchup già presenti vengono adottati (usare --force per rigenerarli)
+                manifest.record(output, key)
+                adopted += 1
+            else:
+                stale.append(preset['name'])
+        if stale:
+            jobs_list.append((team1, team2, tuple(stale)))
+    return jobs_list, keys, adopted
+
+
+def prune_league(directory, presets, expected, manifest):
+    """Elimina i matchup di squadre non più presenti nella cartella.
+
+    Solo i file con l'estensione del livello di codifica del preset: i matchup di un altro formato (es. i PNG
+    committati, quando si prova --encoder webp) non sono mai toccati.
+    """
+    removed = 0
+    prunable = set()
+    for preset in presets:
+        subdir = preset.get('subdir')
+        folder = os.path.join(directory, subdir or '')
+        ext = tier_ext(preset_encoder(preset))
+        prunable.add((subdir or '', ext))
+        if not os.path.isdir(folder):
+            continue
+        for f in os.listdir(folder):
+            output = f"{subdir}/{f}" if subdir else f
+            if os.path.splitext(f)[1] == ext and '_vs_' in f and output not in expected:
+                os.remove(os.path.join(folder, f))
+                manifest.forget(output)
+                removed += 1
+                print(f"Rimosso: {output}")
+    for output in list(manifest.outputs):
+        folder, _, name = output.rpartition('/')
+        if output not in expected and (folder, os.path.splitext(name)[1]) in prunable:
+            manifest.forget(output)
+    return removed
+
+
+def render_league(directory, center_logo, presets, exclude=('image.png',), cache=None,
+                  jobs=1, chunksize=4, force=False, atlas=None, batch=False):
+    """Genera tutti i preset dei matchup nuovi o con input modificati e rimuove quelli obsoleti.
+
+    Con atlas (vedi atlas.py) squadre, hash e tile arrivano dall'atlas: i singoli loghi non vengono letti.
+    Con batch ogni squadra di casa è un lavoro unico, composto con compose_row.
+    """
+    params = (directory, center_logo, presets)
+    with instrument.stage('plan'):
+        manifest = BuildManifest(os.path.join(directory, MANIFEST_NAME))
+        if atlas is not None:
+            # Gli hash arrivano dall'indice: le voci del manifest restano per le esecuzioni senza atlas
+            team_hashes = {f: manifest.known_hash(f, digest) for f, digest in atlas.team_hashes().items()}
+            center_hash = manifest.known_hash(os.path.basename(center_logo), atlas.center_hash())
+            jobs = 1  # i tile dell'atlas vivono nella cache di questo processo
+        else:
+            team_files = find_team_files(directory, set(exclude) | {os.path.basename(center_logo)})
+            team_hashes = {f: manifest.file_hash(os.path.join(directory, f)) for f in team_files}
+            center_hash = manifest.file_hash(os.path.join(directory, center_logo))
+
+        jobs_list, keys, adopted = plan_league(directory, team_hashes, center_hash, presets, manifest, force=force)
+        removed = prune_league(directory, presets, keys, manifest)
+    pending = sum(len(job[2]) for job in jobs_list)
+    instrument.count('matchup.skipped', len(keys) - pending - adopted)
+    instrument.count('matchup.adopted', adopted)
+    instrument.count('matchup.removed', removed)
+    instrument.count('matchup.filesHashed', manifest.hashed)
+    print(f"Da generare: {pending}, invariati: {len(keys) - pending - adopted}, "
+          f"adottati: {adopted}, rimossi: {removed} ({manifest.hashed} file ricalcolati)")
+
+    start = time.perf_counter()
+    renderer = None
+    if batch:
+        jobs_list = group_rows(jobs_list)
+        chunksize = 1  # una riga contiene già n-1 matchup
+    if not jobs_list:
+        results = []
+    elif jobs > 1 and len(jobs_list) > 1:
+        results = _render_parallel(jobs_list, params, manifest.pixels, jobs, chunksize)
+    else:
+        renderer = MatchupRenderer(*params, cache=cache, pixels=manifest.pixels)
+        if atlas is not None:
+            atlas.seed_cache(renderer.cache, directory)
+        results = map(renderer.render, jobs_list)
+
+    stats = {}
+    encoder_stats = EncoderStats()
+    timings = dict.fromkeys(TIMED_STAGES, 0.0)
+    unchanged = rejected = 0
+    try:
+        with instrument.stage('render'):
+            for pid, outputs, elapsed, encodes, job_timings in results:
+                count, busy = stats.get(pid, (0, 0.0))
+                stats[pid] = (count + len(outputs), busy + elapsed)
+                for name, seconds in job_timings.items():
+                    timings[name] += seconds
+                for encoded in encodes:
+                    encoder_stats.add(*encoded)
+                for output, pixels, written in outputs:
+                    if pixels is None:
+                        # Sotto soglia: niente file e niente voce nel manifest (si riprova alla prossima esecuzione)
+                        rejected += 1
+                        print(f"Scartato (sotto la soglia di qualità): {output}")
+                        continue
+                    manifest.record(output, keys[output], pixels)
+                    if written:
+                        print(f"Creato: {output}")
+                    else:
+                        unchanged += 1
+                instrument.count('matchup.rendered', len(outputs))
+    finally:
+        # Anche in caso di errore il manifest registra i matchup già salvati
+        manifest.save()
+
+    print(f"Matchup creati: {pending - unchanged - rejected}, con pixel invariati (file non riscritto): {unchanged}, "
+          f"scartati: {rejected}")
+    instrument.count('matchup.pixelsUnchanged', unchanged)
+    instrument.count('matchup.rejected', rejected)
+    print_worker_summary(stats, time.perf_counter() - start)
+    if encoder_stats.tiers:
+        print("Codifica:")
+        print(encoder_stats.report())
+        instrument.count('matchup.bytesWritten', sum(e['bytes'] for e in encoder_stats.tiers.values()))
+        instrument.count('matchup.encodeSeconds', sum(e['seconds'] for e in encoder_stats.tiers.values()))
+    for name, seconds in timings.items():
+        instrument.count(f"matchup.{name}Seconds", seconds)
+    if renderer is not None:
+        print(renderer.cache.report())
+        instrument.count('tiles.decodes', renderer.cache.decodes)
+        instrument.count('tiles.resizes', renderer.cache.resizes)
+        instrument.count('tiles.cacheHits', renderer.cache.hits)
+    return pending
+
+
+def league_directory(conf):
+    return os.path.join(ROOT_DIR, conf['directory'])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Genera i loghi squadra1_vs_squadra2.png dei campionati.")
+    parser.add_argument('leagues', nargs='*', metavar='league',
+                        help=f"campionati da generare (default tutti: {', '.join(LEAGUES)})")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="processi in parallelo (0 = tutti i core, default 1)")
+    parser.add_argument('--chunksize', type=int, default=4,
+                        help="coppie assegnate a ogni worker per volta (default 4)")
+    parser.add_argument('--force', action='store_true',
+                        help="rigenera tutti i matchup ignorando il manifest")
+    parser.add_argument('--encoder', choices=alpha_tiers(),
+                        help="livello di codifica per tutti i preset, solo livelli con trasparenza "
+                             "(confronto: python encoders.py)")
+    parser.add_argument('--from-atlas', action='store_true',
+                        help="usa i tile dell'atlas del campionato (python atlas.py) invece dei singoli loghi")
+    parser.add_argument('--batch', action='store_true',
+                        help="compone tutta la riga di una squadra di casa in un solo passaggio numpy")
+    args = parser.parse_args(argv)
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+    unknown = [name for name in args.leagues if name not in LEAGUES]
+    if unknown:
+        parser.error(f"campionati sconosciuti: {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    leagues = args.leagues or list(LEAGUES)
+    # Report in .cache/run-reports/matchup-<campionati>.json (combine_seriea.py -> matchup-seriea.json)
+    with instrument.run('matchup-' + '-'.join(leagues)):
+        for name in leagues:
+            conf = LEAGUES[name]
+            print(f"=== {name} ({conf['directory']}) ===")
+            atlas = None
+            if args.from_atlas:
+                from atlas import Atlas
+                atlas = Atlas.load(league_directory(conf))
+            presets = conf['presets']
+            if args.encoder:
+                presets = [dict(p, encoder=args.encoder) for p in presets]
+            render_league(league_directory(conf), conf['center_logo'], presets,
+                          cache=TileCache(), jobs=args.jobs, chunksize=args.chunksize, force=args.force, atlas=atlas,
+                          batch=args.batch)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,225 @@
+import argparse
+import os
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from build_manifest import BuildManifest, params_key
+from encoders import MIME_TYPES, tier_ext
+from matchup import LEAGUES, MatchupRenderer, find_team_files, preset_encoder, render_params
+
+# ==========================================
+# Configurazione
+# ==========================================
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(ROOT_DIR, '.cache', 'matchups')
+DEFAULT_MEMORY_MB = 64
+# L'estensione è quella del livello di codifica del preset (.png di default, .webp/.avif...); ?preset=<nome> opzionale
+ROUTE_RE = re.compile(r'^/matchup/([a-z0-9_-]+)/([a-z0-9_-]+)/([a-z0-9_-]+)(\.[a-z0-9]+)$')
+
+# ==========================================
+# Cache
+# ==========================================
+
+class LRUBytesCache:
+    """LRU in memoria limitata in byte (non in numero di elementi)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class LeagueService:
+    """Renderizza i matchup di un campionato alla prima richiesta (il logo centrale si carica solo allora)."""
+
+    def __init__(self, league, cache_dir):
+        conf = LEAGUES[league]
+        self.league = league
+        self.conf = dict(conf, directory=os.path.join(ROOT_DIR, conf['directory']))
+        self.cache_dir = os.path.join(cache_dir, league)
+        self.presets = {p['name']: p for p in conf['presets']}
+        self.default_preset = conf['presets'][0]['name']
+        self.params = {name: render_params(p, conf['presets']) for name, p in self.presets.items()}
+        self.hashes = BuildManifest()
+        self._renderer = None
+        self._lock = threading.Lock()
+
+    def team_file(self, team):
+        """File sorgente della squadra (es. 'inter.png' o 'como.svg'), con la stessa ricerca di matchup.py; None se assente."""
+        exclude = {'image.png', os.path.basename(self.conf['center_logo'])}
+        files = find_team_files(self.conf['directory'], exclude)
+        return next((f for f in files if os.path.splitext(f)[0] == team), None)
+
+    def key(self, home_file, away_file, preset):
+        """ETag del matchup: hash di parametri e file sorgente, calcolabile senza decodificare immagini."""
+        directory = self.conf['directory']
+        with self._lock:
+            center_hash = self.hashes.file_hash(os.path.join(directory, self.conf['center_logo']))
+            home_hash = self.hashes.file_hash(os.path.join(directory, home_file))
+            away_hash = self.hashes.file_hash(os.path.join(directory, away_file))
+        return params_key(self.params[preset], center_hash, home_hash, away_hash)
+
+    def ext(self, preset):
+        return tier_ext(preset_encoder(self.presets[preset]))
+
+    def content_type(self, preset):
+        return MIME_TYPES[self.ext(preset)]
+
+    def render(self, home_file, away_file, preset):
+        # Il lock copre solo la creazione del renderer: composizione e codifica girano in parallelo
+        # (la TileCache del renderer protegge da sé le proprie ricerche e inserimenti)
+        with self._lock:
+            if self._renderer is None:
+                self._renderer = MatchupRenderer(self.conf['directory'], self.conf['center_logo'],
+                                                 self.conf['presets'])
+            renderer = self._renderer
+        return renderer.render_bytes(home_file, away_file, preset)
+
+
+class MatchupService:
+    """Memoria LRU -> cache su disco -> rendering, nell'ordine."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, memory_bytes=DEFAULT_MEMORY_MB << 20):
+        self.cache_dir = cache_dir
+        self.memory = LRUBytesCache(memory_bytes)
+        self.leagues = {}
+        self.stats = {'memory': 0, 'disk': 0, 'rendered': 0, 'not_modified': 0}
+        self._lock = threading.Lock()
+
+    def league(self, name):
+        if name not in LEAGUES:
+            return None
+        with self._lock:
+            if name not in self.leagues:
+                self.leagues[name] = LeagueService(name, self.cache_dir)
+            return self.leagues[name]
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, service, home_file, away_file, preset, key):
+        data = self.memory.get(key)
+        if data is not None:
+            self.count('memory')
+            return data
+
+        path = os.path.join(service.cache_dir, f"{key}{service.ext(preset)}")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.count('disk')
+        else:
+            data = service.render(home_file, away_file, preset)
+            os.makedirs(service.cache_dir, exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self.count('rendered')
+        self.memory.put(key, data)
+        return data
+
+# ==========================================
+# HTTP
+# ==========================================
+
+class MatchupHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        match = ROUTE_RE.match(path)
+        if not match:
+            self.send_error(404, "Percorso non valido: usare /matchup/<league>/<home>/<away>.<estensione>")
+            return
+        league_name, home, away, ext = match.groups()
+        league = self.service.league(league_name)
+        if league is None:
+            self.send_error(404, f"Campionato sconosciuto: {league_name}")
+            return
+        home_file, away_file = league.team_file(home), league.team_file(away)
+        if home == away or home_file is None or away_file is None:
+            self.send_error(404, f"Squadra sconosciuta o matchup non valido: {home} vs {away}")
+            return
+
+        preset = parse_qs(query).get('preset', [league.default_preset])[0]
+        if preset not in league.presets:
+            self.send_error(404, f"Preset sconosciuto: {preset}")
+            return
+        if ext != league.ext(preset):
+            self.send_error(404, f"Il preset {preset} produce file {league.ext(preset)}, non {ext}")
+            return
+
+        key = league.key(home_file, away_file, preset)
+        etag = f'"{key}"'
+        if etag in self.headers.get('If-None-Match', ''):
+            self.service.count('not_modified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        try:
+            data = self.service.get(league, home_file, away_file, preset, key)
+        except ValueError as e:
+            # Livello del preset sotto la soglia di qualità e senza fallback: meglio un errore che un'immagine rovinata
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', league.content_type(preset))
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'public, max-age=3600')
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server locale che genera i matchup su richiesta.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8088)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--memory-mb', type=int, default=DEFAULT_MEMORY_MB,
+                        help="dimensione massima della cache LRU in memoria (MB)")
+    args = parser.parse_args(argv)
+
+    MatchupHandler.service = MatchupService(args.cache_dir, args.memory_mb << 20)
+    server = ThreadingHTTPServer((args.host, args.port), MatchupHandler)
+    print(f"Server matchup in ascolto su http://{args.host}:{args.port}/matchup/<league>/<home>/<away>.png "
+          f"(o .webp/.avif secondo il preset)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Statistiche: {MatchupHandler.service.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import glob
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import instrument
+
+# ==========================================
+# Scrittura della programmazione (JSON -> daddyliveSchedule.json)
+# ==========================================
+# Un solo passaggio in memoria: normalizzazione, serializzazione, confronto con il file precedente, scrittura
+# atomica. Se il contenuto non cambia il file non viene toccato (nessun commit dal workflow); se cambia,
+# accanto al file si scrive il delta con gli eventi aggiunti, rimossi e modificati.
+# Nella cartella omonima (daddyliveSchedule/) un file per giorno e index.json, per chi ne legge solo una parte.
+
+DELTA_SUFFIX = '.delta.json'
+INDEX_NAME = 'index.json'
+# Fuso degli orari della pagina: UTC perché i titoli dei giorni dicono "Schedule Time UK GMT" (GMT tutto
+# l'anno, non l'ora legale britannica). Se la pagina passasse a "UK BST" o a un altro fuso, va cambiato qui.
+SCHEDULE_TZ = timezone.utc
+# Un orario più indietro di così rispetto all'evento precedente della categoria è già il giorno dopo
+WRAP_HOURS = 12
+
+DAY_DATE_RE = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]+)\s+(\d{4})')
+TIME_RE = re.compile(r'(\d{1,2}):(\d{2})$')
+MONTHS = {m: n for n, m in enumerate(('jan', 'feb', 'mar', 'apr', 'may', 'jun',
+                                       'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), 1)}
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+
+def canonical_hash(data):
+    """Hash del contenuto indipendente da indentazione e ordine delle chiavi."""
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def delta_path(path):
+    return f"{os.path.splitext(path)[0]}{DELTA_SUFFIX}"
+
+
+def load_schedule(path):
+    """Programmazione scritta dall'esecuzione precedente, o None se manca o non è leggibile."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# ==========================================
+# Delta tra due programmazioni
+# ==========================================
+
+def index_events(data):
+    """{(giorno, categoria, orario, evento, n): [id canali]}; n distingue gli eventi ripetuti identici."""
+    events = {}
+    for day, categories in (data or {}).items():
+        for category, items in categories.items():
+            for event in items:
+                key = (day, category, event.get('time', ''), event.get('event', ''))
+                n = 0
+                while key + (n,) in events:
+                    n += 1
+                events[key + (n,)] = [c.get('channel_id') for c in event.get('channels', [])]
+    return events
+
+
+def _event(key, **extra):
+    day, category, time, title, _ = key
+    return {'day': day, 'category': category, 'time': time, 'event': title, **extra}
+
+
+def diff_schedule(old, new):
+    """Eventi aggiunti, rimossi e con canali cambiati (solo gli id dei canali, per restare compatto)."""
+    before, after = index_events(old), index_events(new)
+    added = [_event(k, channels=after[k]) for k in after if k not in before]
+    removed = [_event(k) for k in before if k not in after]
+    changed = []
+    for key, channels in after.items():
+        if key in before and before[key] != channels:
+            old_ids = set(before[key])
+            new_ids = set(channels)
+            changed.append(_event(key, channelsAdded=[c for c in channels if c not in old_ids],
+                                  channelsRemoved=[c for c in before[key] if c not in new_ids]))
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def dumps_lines(obj):
+    """Una voce per riga, come assets.json: elementi delle liste e chiavi dei dizionari di primo livello."""
+    def compact(value):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+    parts = []
+    for name, value in obj.items():
+        if isinstance(value, list) and value:
+            parts.append(f"{json.dumps(name)}: [\n" + ',\n'.join(f"  {compact(v)}" for v in value) + "\n]")
+        elif isinstance(value, dict) and value:
+            items = ',\n'.join(f"  {json.dumps(k, ensure_ascii=False)}: {compact(v)}" for k, v in value.items())
+            parts.append(f"{json.dumps(name)}: {{\n{items}\n}}")
+        else:
+            parts.append(f"{json.dumps(name)}: {compact(value)}")
+    return '{' + ',\n'.join(parts) + '}\n'
+
+# ==========================================
+# File per giorno e indice
+# ==========================================
+
+def shard_dir(path):
+    return os.path.splitext(path)[0]
+
+
+def day_date(title):
+    """'Saturday 08th Aug 2026 - Schedule Time UK GMT' -> date(2026, 8, 8), o None se non riconosciuta."""
+    match = DAY_DATE_RE.search(title)
+    month = MONTHS.get(match.group(2)[:3].lower()) if match else None
+    if month is None:
+        return None
+    try:
+        return datetime(int(match.group(3)), month, int(match.group(1))).date()
+    except ValueError:
+        return None
+
+
+def start_time(date, time, previous=None):
+    """Inizio dell'evento in UTC, o None se manca la data del giorno o l'orario non è HH:MM.
+
+    Le categorie elencano gli eventi in ordine di orario e proseguono oltre la mezzanotte sotto lo stesso giorno
+    ("... 23:30, 00:15, 01:00"): previous è l'inizio dell'evento precedente della categoria e un orario più
+    indietro di WRAP_HOURS cade il giorno dopo. I piccoli disordini della pagina (15:30 poi 14:00) restano nel giorno.
+    """
+    match = TIME_RE.match(time.strip()) if date else None
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        return None
+    local = datetime(date.year, date.month, date.day, int(match.group(1)), int(match.group(2)), tzinfo=SCHEDULE_TZ)
+    if previous is not None and local < previous - timedelta(hours=WRAP_HOURS):
+        local += timedelta(days=1)
+    return local.astimezone(timezone.utc)
+
+
+def _shard_name(title, date, used):
+    name = date.isoformat() if date else re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-') or 'day'
+    base, n = name, 2
+    while name in used:
+        name = f"{base}-{n}"
+        n += 1
+    used.add(name)
+    return name
+
+
+def build_shards(data, digest):
+    """({nome file: giorno}, indice); ogni evento ha un id "giorno/posizione" usato dall'indice."""
+    shards, used = {}, set()
+    days, starts, categories, channels = {}, [], {}, {}
+    for title, day_categories in data.items():
+        date = day_date(title)
+        name = _shard_name(title, date, used)
+        events = []
+        for category, items in day_categories.items():
+            previous = None
+            for event in items:
+                position = len(events)
+                event_id = f"{name}/{position}"
+                start = start_time(date, event.get('time', ''), previous)
+                previous = start or previous
+                events.append({'id': event_id, 'start': start.strftime('%Y-%m-%dT%H:%M:%SZ') if start else None,
+                               'category': category, **event})
+                if start:
+                    starts.append((int(start.timestamp()), len(shards), position, event_id))
+                categories.setdefault(category, []).append(event_id)
+                for channel in event.get('channels', []):
+                    ids = channels.setdefault(channel.get('channel_id'), [])
+                    if not ids or ids[-1] != event_id:
+                        ids.append(event_id)
+        shards[name] = {'title': title, 'date': date.isoformat() if date else None, 'events': events}
+        days[name] = {'title': title, 'file': f"{name}.json", 'events': len(events)}
+
+    starts.sort()
+    index = {
+        'hash': digest,
+        'days': days,
+        # Inizi in secondi UTC, ordinati: bisect su startTimes per gli eventi di un intervallo
+        'startTimes': [item[0] for item in starts],
+        'startIds': [item[-1] for item in starts],
+        'categories': categories,
+        'channels': channels,
+    }
+    return shards, index
+
+
+def load_index(path):
+    try:
+        with open(os.path.join(shard_dir(path), INDEX_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_shards(data, path, digest):
+    """Un file per giorno più index.json; i giorni spariti si cancellano dopo aver scritto il nuovo indice."""
+    directory = shard_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    shards, index = build_shards(data, digest)
+    for name, shard in shards.items():
+        shard_path = os.path.join(directory, f"{name}.json")
+        text = dumps_lines(shard)
+        if _read_text(shard_path) != text:
+            _write_atomic(shard_path, text)
+    _write_atomic(os.path.join(directory, INDEX_NAME), dumps_lines(index))
+    for stale in glob.glob(os.path.join(directory, '*.json')):
+        if os.path.basename(stale) != INDEX_NAME and os.path.splitext(os.path.basename(stale))[0] not in shards:
+            os.remove(stale)
+    return index
+
+# ==========================================
+# Scrittura
+# ==========================================
+
+def _read_text(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_schedule(data, path, normalise=None):
+    """Normalizza e scrive la programmazione in modo atomico; False se il contenuto è uguale a quello su disco."""
+    with instrument.stage('output'):
+        return _write_schedule(data, path, normalise)
+
+
+def _write_schedule(data, path, normalise):
+    if normalise is not None:
+        data = normalise(data)
+    digest = canonical_hash(data)
+    index = load_index(path)
+    if index is None or index.get('hash') != digest:
+        index = write_shards(data, path, digest)
+        instrument.count('schedule.daysWritten', len(index['days']))
+        print(f"File per giorno in {shard_dir(path)}: {len(index['days'])} giorni, "
+              f"{len(index['startIds'])} eventi con orario")
+    previous = load_schedule(path)
+    previous_digest = canonical_hash(previous) if previous is not None else None
+    if digest == previous_digest:
+        print(f"Programmazione invariata ({digest[:12]}): {path} non riscritto")
+        instrument.count('schedule.unchanged')
+        return False
+
+    text = json.dumps(data, indent=4)
+    _write_atomic(path, text)
+    instrument.count('schedule.bytesWritten', len(text.encode('utf-8')))
+
+    delta = {'generatedAt': utc_now(), 'from': previous_digest, 'to': digest, **diff_schedule(previous, data)}
+    _write_atomic(delta_path(path), dumps_lines(delta))
+    print(f"Dati JSON salvati in {path}: {len(delta['added'])} eventi aggiunti, {len(delta['removed'])} rimossi, "
+          f"{len(delta['changed'])} modificati")
+    return True
@@ -0,0 +1,339 @@
+import re
+
+import instrument
+
+# ==========================================
+# Parser della programmazione (HTML -> JSON)
+# ==========================================
+# Due layout del sito:
+#   'table': righe tr.date-row / tr.category-row / tr.event-row / tr.channel-row (extract.py)
+#   'div':   div#schedule > div.schedule__day > div.schedule__category > div.schedule__event (extractflare.py, extractdlhd.py)
+# Due motori che producono lo stesso JSON: 'lxml' (un solo parse in C, XPath e regex precompilate) e 'bs4'
+# (il parser originale con BeautifulSoup/html.parser, tenuto come riferimento e come ripiego senza lxml).
+
+STREAM_ID_RE = re.compile(r'stream-(\d+)\.php')
+TABLE_CH_SUFFIX_RE = re.compile(r'\s*\(CH-\d+\)$')
+# Link canale del layout div: "/watch.php?id=123" (un solo livello di escape; la prima versione con
+# r'/watch\\.php...' non trovava nessun link e lasciava channels[] vuoto)
+WATCH_HREF_RE = re.compile(r'/watch\.php\?id=\d+')
+WATCH_ID_RE = re.compile(r'id=(\d+)')
+# Pattern storico con doppio escape: non toglie il suffisso " CH-123" dai nomi canale del layout div.
+# Resta identico perché il JSON pubblicato (e chi lo usa) dipende da quei nomi.
+DIV_CH_SUFFIX_RE = re.compile(r'\\s*CH-\\d+$')
+
+NO_DATE_ROWS = "AVVISO: Nessuna riga di data trovata nel contenuto HTML!"
+NO_SCHEDULE_DIV = "AVVISO: Contenitore 'schedule' non trovato nel contenuto HTML!"
+
+# ==========================================
+# Motore bs4 (riferimento)
+# ==========================================
+
+def bs4_table(html_content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+    result = {}
+
+    date_rows = soup.find_all('tr', class_='date-row')
+    if not date_rows:
+        print(NO_DATE_ROWS)
+        return {}
+
+    current_date = None
+    current_category = None
+
+    for row in soup.find_all('tr'):
+        if 'date-row' in row.get('class', []):
+            current_date = row.find('strong').text.strip()
+            result[current_date] = {}
+            current_category = None
+
+        elif 'category-row' in row.get('class', []) and current_date:
+            current_category = row.find('strong').text.strip() + "</span>"
+            result[current_date][current_category] = []
+
+        elif 'event-row' in row.get('class', []) and current_date and current_category:
+            time_div = row.find('div', class_='event-time')
+            info_div = row.find('div', class_='event-info')
+
+            if not time_div or not info_div:
+                continue
+
+            time_strong = time_div.find('strong')
+            event_time = time_strong.text.strip() if time_strong else ""
+            event_info = info_div.text.strip()
+
+            event_data = {
+                "time": event_time,
+                "event": event_info,
+                "channels": []
+            }
+
+            # Cerca la riga dei canali successiva
+            next_row = row.find_next_sibling('tr')
+            if next_row and 'channel-row' in next_row.get('class', []):
+                channel_links = next_row.find_all('a', class_='channel-button-small')
+                for link in channel_links:
+                    href = link.get('href', '')
+                    channel_id_match = STREAM_ID_RE.search(href)
+                    if channel_id_match:
+                        channel_id = channel_id_match.group(1)
+                        channel_name = link.text.strip()
+                        channel_name = TABLE_CH_SUFFIX_RE.sub('', channel_name)
+
+                        event_data["channels"].append({
+                            "channel_name": channel_name,
+                            "channel_id": channel_id
+                        })
+
+            result[current_date][current_category].append(event_data)
+
+    return result
+
+
+def bs4_div(html_content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+    result = {}
+
+    schedule_div = soup.find('div', id='schedule')
+    if not schedule_div:
+        print(NO_SCHEDULE_DIV)
+        return {}
+
+    for day_div in schedule_div.find_all('div', class_='schedule__day'):
+        day_title_tag = day_div.find('div', class_='schedule__dayTitle')
+        if not day_title_tag:
+            continue
+        current_date = day_title_tag.text.strip()
+        result[current_date] = {}
+
+        for category_div in day_div.find_all('div', class_='schedule__category'):
+            cat_header = category_div.find('div', class_='schedule__catHeader')
+            if not cat_header:
+                continue
+            current_category = cat_header.text.strip()
+            result[current_date][current_category] = []
+
+            category_body = category_div.find('div', class_='schedule__categoryBody')
+            if not category_body:
+                continue
+
+            for event_div in category_body.find_all('div', class_='schedule__event'):
+                event_header = event_div.find('div', class_='schedule__eventHeader')
+                if not event_header:
+                    continue
+                time_span = event_header.find('span', class_='schedule__time')
+                event_title_span = event_header.find('span', class_='schedule__eventTitle')
+                event_data = {
+                    "time": time_span.text.strip() if time_span else "",
+                    "event": event_title_span.text.strip() if event_title_span else "Evento Sconosciuto",
+                    "channels": []
+                }
+                channels_div = event_div.find('div', class_='schedule__channels')
+                if channels_div:
+                    for link in channels_div.find_all('a', href=WATCH_HREF_RE):
+                        href = link.get('href', '')
+                        channel_id_match = WATCH_ID_RE.search(href)
+                        if channel_id_match:
+                            channel_id = channel_id_match.group(1)
+                            channel_name = link.text.strip()
+                            channel_name = DIV_CH_SUFFIX_RE.sub('', channel_name).strip()
+                            event_data["channels"].append({
+                                "channel_name": channel_name,
+                                "channel_id": channel_id
+                            })
+                result[current_date][current_category].append(event_data)
+    return result
+
+# ==========================================
+# Motore lxml
+# ==========================================
+
+_xpaths = None
+
+
+def _compiled():
+    """XPath compilate una volta sola (lxml viene importato solo se si usa questo motore)."""
+    global _xpaths
+    if _xpaths is None:
+        from lxml import etree
+
+        def first(tag, cls):
+            # Come find() di BeautifulSoup: primo discendente in ordine di documento con quella classe
+            return etree.XPath(f'descendant::{tag}[contains(concat(" ", normalize-space(@class), " "), " {cls} ")][1]')
+
+        def all_(tag, cls):
+            return etree.XPath(f'descendant::{tag}[contains(concat(" ", normalize-space(@class), " "), " {cls} ")]')
+
+        _xpaths = {
+            # Testo come .text di BeautifulSoup: esclusi commenti e contenuto di script/style
+            'text': etree.XPath('descendant::text()[not(parent::script or parent::style)]'),
+            'tr': etree.XPath('//tr'),
+            'strong': etree.XPath('descendant::strong[1]'),
+            'event_time': first('div', 'event-time'),
+            'event_info': first('div', 'event-info'),
+            'channel_links': all_('a', 'channel-button-small'),
+            'schedule': etree.XPath('descendant::div[@id="schedule"][1]'),
+            'days': all_('div', 'schedule__day'),
+            'day_title': first('div', 'schedule__dayTitle'),
+            'categories': all_('div', 'schedule__category'),
+            'cat_header': first('div', 'schedule__catHeader'),
+            'cat_body': first('div', 'schedule__categoryBody'),
+            'events': all_('div', 'schedule__event'),
+            'event_header': first('div', 'schedule__eventHeader'),
+            'time_span': first('span', 'schedule__time'),
+            'title_span': first('span', 'schedule__eventTitle'),
+            'channels': first('div', 'schedule__channels'),
+            'links': etree.XPath('descendant::a[@href]'),
+        }
+    return _xpaths
+
+
+def _parse_document(html_content):
+    # Parser HTML di libxml2 senza le classi di lxml.html (la loro lookup per elemento costa più del parse)
+    from lxml import etree
+    try:
+        return etree.HTML(html_content)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def _one(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+
+def _text(x, node):
+    return ''.join(x['text'](node))
+
+
+def _classes(node):
+    return (node.get('class') or '').split()
+
+
+def lxml_table(html_content):
+    x = _compiled()
+    root = _parse_document(html_content)
+    rows = x['tr'](root) if root is not None else []
+    if not any('date-row' in _classes(row) for row in rows):
+        print(NO_DATE_ROWS)
+        return {}
+
+    result = {}
+    current_date = None
+    current_category = None
+    for row in rows:
+        classes = _classes(row)
+        if 'date-row' in classes:
+            current_date = _text(x, _one(x['strong'], row)).strip()
+            result[current_date] = {}
+            current_category = None
+
+        elif 'category-row' in classes and current_date:
+            current_category = _text(x, _one(x['strong'], row)).strip() + "</span>"
+            result[current_date][current_category] = []
+
+        elif 'event-row' in classes and current_date and current_category:
+            time_div = _one(x['event_time'], row)
+            info_div = _one(x['event_info'], row)
+            if time_div is None or info_div is None:
+                continue
+
+            time_strong = _one(x['strong'], time_div)
+            event_data = {
+                "time": _text(x, time_strong).strip() if time_strong is not None else "",
+                "event": _text(x, info_div).strip(),
+                "channels": []
+            }
+
+            next_row = next(row.itersiblings('tr'), None)
+            if next_row is not None and 'channel-row' in _classes(next_row):
+                for link in x['channel_links'](next_row):
+                    channel_id_match = STREAM_ID_RE.search(link.get('href', ''))
+                    if channel_id_match:
+                        event_data["channels"].append({
+                            "channel_name": TABLE_CH_SUFFIX_RE.sub('', _text(x, link).strip()),
+                            "channel_id": channel_id_match.group(1)
+                        })
+
+            result[current_date][current_category].append(event_data)
+    return result
+
+
+def lxml_div(html_content):
+    x = _compiled()
+    root = _parse_document(html_content)
+    schedule_div = _one(x['schedule'], root) if root is not None else None
+    if schedule_div is None:
+        print(NO_SCHEDULE_DIV)
+        return {}
+
+    result = {}
+    for day_div in x['days'](schedule_div):
+        day_title = _one(x['day_title'], day_div)
+        if day_title is None:
+            continue
+        current_date = _text(x, day_title).strip()
+        day = result[current_date] = {}
+
+        for category_div in x['categories'](day_div):
+            cat_header = _one(x['cat_header'], category_div)
+            if cat_header is None:
+                continue
+            events = day[_text(x, cat_header).strip()] = []
+
+            category_body = _one(x['cat_body'], category_div)
+            if category_body is None:
+                continue
+
+            for event_div in x['events'](category_body):
+                event_header = _one(x['event_header'], event_div)
+                if event_header is None:
+                    continue
+                time_span = _one(x['time_span'], event_header)
+                title_span = _one(x['title_span'], event_header)
+                event_data = {
+                    "time": _text(x, time_span).strip() if time_span is not None else "",
+                    "event": _text(x, title_span).strip() if title_span is not None else "Evento Sconosciuto",
+                    "channels": []
+                }
+                channels_div = _one(x['channels'], event_div)
+                if channels_div is not None:
+                    for link in x['links'](channels_div):
+                        href = link.get('href')
+                        if not WATCH_HREF_RE.search(href):
+                            continue
+                        channel_id_match = WATCH_ID_RE.search(href)
+                        if channel_id_match:
+                            event_data["channels"].append({
+                                "channel_name": DIV_CH_SUFFIX_RE.sub('', _text(x, link).strip()).strip(),
+                                "channel_id": channel_id_match.group(1)
+                            })
+                events.append(event_data)
+    return result
+
+# ==========================================
+# Scelta del motore
+# ==========================================
+
+ENGINES = {
+    'lxml': {'table': lxml_table, 'div': lxml_div},
+    'bs4': {'table': bs4_table, 'div': bs4_div},
+}
+
+
+def default_engine():
+    try:
+        import lxml.html  # noqa: F401
+    except ImportError:
+        return 'bs4'
+    return 'lxml'
+
+
+def html_to_json(html_content, layout, engine=None):
+    """Converte l'HTML della programmazione in {giorno: {categoria: [eventi]}} con il layout indicato."""
+    with instrument.stage('parse'):
+        result = ENGINES[engine or default_engine()][layout](html_content)
+    instrument.count('parse.bytes', len(html_content))
+    instrument.count('parse.events', sum(len(events) for day in result.values() for events in day.values()))
+    return result
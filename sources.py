@@ -0,0 +1,132 @@
+import hashlib
+import io
+import os
+import re
+from PIL import Image
+
+# ==========================================
+# Configurazione
+# ==========================================
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RASTER_DIR = os.path.join(ROOT_DIR, '.cache', 'raster')
+SNIFF_BYTES = 1024
+
+# Firme dei formati raster accettati (i primi byte del file)
+MAGIC = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+    (b'\x00\x00\x01\x00', 'ico'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+)
+HTML_RE = re.compile(rb'<(!doctype\s+html|html|head|body|script|meta)[\s>/]', re.IGNORECASE)
+SVG_RE = re.compile(rb'<svg[\s>]', re.IGNORECASE)
+
+
+class SourceError(ValueError):
+    """Il contenuto scaricato non è un'immagine utilizzabile (pagina HTML, errore, formato ignoto)."""
+
+
+def sniff(data):
+    """Tipo del contenuto dai primi byte: 'png', 'jpeg', ..., 'svg', 'html' oppure None."""
+    head = data[:SNIFF_BYTES]
+    for magic, kind in MAGIC:
+        if head.startswith(magic):
+            return kind
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis', b'mif1'):
+        return 'avif'
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    if text.startswith(b'<'):
+        # Una pagina HTML può contenere <svg> inline: si controlla prima l'HTML
+        if HTML_RE.search(text):
+            return 'html'
+        if SVG_RE.search(text) or SVG_RE.search(data):
+            return 'svg'
+        return 'html' if b'<' in text[1:] else None
+    return None
+
+
+def check_source(data):
+    """Tipo del contenuto, o SourceError senza tentare la decodifica se non è un'immagine."""
+    if not data:
+        raise SourceError("Contenuto vuoto")
+    kind = sniff(data)
+    if kind == 'html':
+        raise SourceError("Contenuto HTML al posto dell'immagine")
+    if kind is None:
+        raise SourceError(f"Formato immagine non riconosciuto (inizia con {data[:8]!r})")
+    return kind
+
+# ==========================================
+# Rasterizzazione SVG
+# ==========================================
+
+class RasterCache:
+    """Cache su disco degli SVG rasterizzati: un PNG per (hash del sorgente, riquadro)."""
+
+    def __init__(self, cache_dir=DEFAULT_RASTER_DIR):
+        self.cache_dir = cache_dir
+        self.rendered = 0
+        self.hits = 0
+
+    def _path(self, digest, box):
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}-{box[0]}x{box[1]}.png")
+
+    def rasterize(self, data, box):
+        """SVG adattato al riquadro box (w, h) mantenendo le proporzioni."""
+        path = self._path(hashlib.sha256(data).hexdigest(), box)
+        if os.path.exists(path):
+            self.hits += 1
+            with Image.open(path) as img:
+                return img.convert('RGBA')
+
+        try:
+            import cairosvg
+        except ImportError:
+            raise SourceError("Sorgente SVG: installare cairosvg per rasterizzarla") from None
+        png = cairosvg.svg2png(bytestring=data, output_width=box[0])
+        with Image.open(io.BytesIO(png)) as img:
+            if img.height > box[1]:
+                png = cairosvg.svg2png(bytestring=data, output_height=box[1])
+        with Image.open(io.BytesIO(png)) as img:
+            img = img.convert('RGBA')
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        img.save(f"{path}.tmp", 'PNG')
+        os.replace(f"{path}.tmp", path)
+        self.rendered += 1
+        return img
+
+    def report(self):
+        return f"SVG: {self.rendered} rasterizzati, {self.hits} letti dalla cache"
+
+
+class LogoSource:
+    """Sorgente di un logo già controllata: raster decodificato una volta, SVG rasterizzato per riquadro."""
+
+    def __init__(self, data, raster_cache=None):
+        self.kind = check_source(data)
+        self.data = data
+        self.raster_cache = raster_cache or RasterCache()
+        self._image = None
+        if self.kind != 'svg':
+            with Image.open(io.BytesIO(data)) as img:
+                self._image = img.convert('RGBA')
+
+    def image(self, box):
+        """Immagine RGBA da adattare a box: il raster originale, o l'SVG rasterizzato a quella misura."""
+        if self._image is not None:
+            return self._image
+        return self.raster_cache.rasterize(self.data, box)
+
+
+def open_logo(path, box, raster_cache=None):
+    """Apre un logo da file (PNG, JPEG, ... o SVG) come RGBA; box serve solo per gli SVG."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return LogoSource(data, raster_cache).image(box)
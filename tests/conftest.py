@@ -0,0 +1,60 @@
+import io
+import os
+import sys
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+# Gli script stanno nella radice del repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def png_bytes(size=(64, 32), color=(200, 30, 30, 255)):
+    buf = io.BytesIO()
+    Image.new('RGBA', size, color).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+class StubServer:
+    """Server HTTP locale: path -> lista di risposte (status, header, corpo), servite in ordine.
+
+    L'ultima risposta della lista si ripete; hits conta le richieste ricevute per path.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.hits = Counter()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits[self.path] += 1
+                responses = stub.routes.get(self.path, [(404, {}, b'not found')])
+                status, headers, body = responses[min(stub.hits[self.path], len(responses)) - 1]
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+
+@pytest.fixture
+def stub_server():
+    stub = StubServer()
+    stub.thread.start()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
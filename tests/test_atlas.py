@@ -0,0 +1,51 @@
+import json
+import os
+
+from PIL import Image
+
+import atlas
+from build_manifest import BuildManifest
+from matchup import MANIFEST_NAME, render_league
+
+PRESETS = [{'name': 'default', 'width': 160, 'height': 90, 'center_size': 30}]
+
+
+def make_league(directory):
+    for name, color in (('alpha', (200, 0, 0, 255)), ('beta', (0, 0, 200, 255)), ('gamma', (0, 120, 0, 255)),
+                        ('center', (250, 250, 0, 255))):
+        Image.new('RGBA', (96, 96), color).save(directory / f"{name}.png")
+
+
+def manifest_inputs(directory):
+    with open(directory / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+        return json.load(f)['inputs']
+
+
+def test_atlas_run_keeps_manifest_inputs(tmp_path, monkeypatch):
+    make_league(tmp_path)
+    monkeypatch.setattr(atlas, 'LEAGUES', {'test': {'directory': str(tmp_path), 'center_logo': 'center.png',
+                                                     'presets': PRESETS}})
+    render_league(str(tmp_path), 'center.png', PRESETS)
+    inputs = manifest_inputs(tmp_path)
+    assert sorted(inputs) == ['alpha.png', 'beta.png', 'center.png', 'gamma.png']
+
+    atlas.build_atlas('test')
+    os.remove(tmp_path / 'alpha_vs_beta.png')  # un matchup da rigenerare con i tile dell'atlas
+    assert render_league(str(tmp_path), 'center.png', PRESETS, atlas=atlas.Atlas.load(str(tmp_path))) == 1
+    assert manifest_inputs(tmp_path) == inputs
+
+    # L'esecuzione successiva senza atlas non ricalcola nessun hash
+    manifest = BuildManifest(str(tmp_path / MANIFEST_NAME))
+    for name in inputs:
+        manifest.file_hash(str(tmp_path / name))
+    assert manifest.hashed == 0
+
+
+def test_known_hash_drops_mismatched_entry(tmp_path):
+    manifest = BuildManifest(str(tmp_path / MANIFEST_NAME))
+    manifest.inputs = {'a.png': {'size': 1, 'mtime_ns': 1, 'sha256': 'old'},
+                       'b.png': {'size': 1, 'mtime_ns': 1, 'sha256': 'same'}}
+    assert manifest.known_hash('a.png', 'new') == 'new'
+    assert manifest.known_hash('b.png', 'same') == 'same'
+    manifest.save()
+    assert manifest_inputs(tmp_path) == {'b.png': {'size': 1, 'mtime_ns': 1, 'sha256': 'same'}}
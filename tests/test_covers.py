@@ -0,0 +1,123 @@
+import io
+import json
+import os
+
+import covers
+from conftest import png_bytes
+from http_cache import HTTPCache
+
+
+def write_channels(path, channels):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(channels, f)
+    return str(path)
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_generate_report_and_retries(tmp_path, stub_server):
+    logo = png_bytes()
+    stub_server.routes = {
+        '/logo.png': [(200, {'Content-Type': 'image/png'}, logo)],
+        '/page.html': [(200, {'Content-Type': 'text/html'}, b'<!DOCTYPE html><html><body>no</body></html>')],
+        '/busy.png': [(429, {'Retry-After': '1'}, b''), (200, {'Content-Type': 'image/png'}, logo)],
+    }
+    url = stub_server.url
+    input_path = write_channels(tmp_path / 'world.json', [
+        {'name': 'Rai 1', 'logo': url('/logo.png')},
+        {'name': 'Rai 2', 'logo': url('/logo.png')},
+        {'name': 'Pagina', 'logo': url('/page.html')},
+        {'name': 'Lento', 'logo': url('/busy.png')},
+        {'name': 'Sparito', 'logo': url('/missing.png')},
+        {'logo': url('/logo.png')},
+    ])
+    output = tmp_path / 'covers'
+
+    covers.generate(input_path, str(output), presets=('landscape',), cache=HTTPCache(str(tmp_path / 'http')))
+
+    report = load_json(output / covers.REPORT_NAME)
+    assert report['channelsProcessed'] == 6
+    assert report['coversGenerated'] == 3
+    failures = {f['channelName']: f['error'] for f in report['failures']}
+    assert failures == {
+        'Pagina': "Contenuto HTML al posto dell'immagine",
+        'Sparito': 'HTTP 404',
+        '': 'Nome canale vuoto',
+    }
+    assert all(f['presetName'] == 'landscape' for f in report['failures'])
+    assert not os.path.exists(output / covers.JOURNAL_NAME)
+    for name in ('rai-1', 'rai-2', 'lento'):
+        assert os.path.exists(output / 'landscape' / f"{name}.jpg")
+
+    # Un download per URL; il 429 viene ritentato dopo il Retry-After, il 404 no
+    assert stub_server.hits['/logo.png'] == 1
+    assert stub_server.hits['/busy.png'] == 2
+    assert stub_server.hits['/missing.png'] == 1
+
+
+def test_generate_skips_fresh_covers(tmp_path, stub_server):
+    stub_server.routes = {'/logo.png': [(200, {'Content-Type': 'image/png'}, png_bytes())]}
+    input_path = write_channels(tmp_path / 'world.json', {'Rai 1': stub_server.url('/logo.png')})
+    output = str(tmp_path / 'covers')
+    cache = HTTPCache(str(tmp_path / 'http'))
+
+    covers.generate(input_path, output, presets=('portrait',), cache=cache)
+    covers.generate(input_path, output, presets=('portrait',), cache=cache)
+
+    report = load_json(os.path.join(output, covers.REPORT_NAME))
+    assert report['coversGenerated'] == 0
+    assert report['failures'] == []
+    assert stub_server.hits['/logo.png'] == 1
+
+
+def test_parse_channels_keeps_unnamed_list_entries():
+    channels = covers.parse_channels([{'name': ' Rai 1 ', 'logo': 'http://x/a.png'}, {'logo': 'http://x/b.png'}, 42])
+    assert channels == [('Rai 1', 'http://x/a.png'), ('', 'http://x/b.png')]
+
+
+def test_iter_json_items_numbers_across_chunks():
+    text = '{"a": 12.5e3, "b": -7, "c": [1, 2], "d": {"logo": "http://x/1.png"}}'
+    expected = [('a', 12500.0), ('b', -7), ('c', [1, 2]), ('d', {'logo': 'http://x/1.png'})]
+    for chunk_size in range(1, len(text) + 2):
+        assert list(covers.iter_json_items(io.StringIO(text), chunk_size)) == expected
+
+
+def test_resume_retries_failures_and_merges_counts(tmp_path, stub_server):
+    logo = png_bytes()
+    stub_server.routes = {
+        '/a.png': [(200, {}, logo)],
+        '/a2.png': [(200, {}, png_bytes(color=(0, 90, 200, 255)))],
+        '/b.png': [(404, {}, b''), (200, {}, logo)],
+        '/c.png': [(200, {}, logo)],
+    }
+    url = stub_server.url
+    input_path = tmp_path / 'world.json'
+    output = tmp_path / 'covers'
+    args = [str(input_path), '--output', str(output), '--presets', 'landscape', '--cache-dir', str(tmp_path / 'http')]
+
+    write_channels(input_path, {'A': url('/a.png'), 'B': url('/b.png'), 'C': url('/c.png')})
+    covers.main(args)
+    first = load_json(output / covers.REPORT_NAME)
+    assert first['coversGenerated'] == 2
+    assert [(f['channelName'], f['presetName']) for f in first['failures']] == [('B', 'landscape')]
+
+    # Ripresa: B è in retry, A ha un URL nuovo; C resta com'è e non viene riscaricato
+    write_channels(input_path, {'A': url('/a2.png'), 'B': url('/b.png'), 'C': url('/c.png')})
+    covers.main(args + ['--resume'])
+    second = load_json(output / covers.REPORT_NAME)
+    assert second['coversGenerated'] == 3
+    assert second['recovered'] == 1
+    assert second['resumedFrom'] == first['generatedAt']
+    assert second['failures'] == []
+    assert sorted(g['channelName'] for g in second['generated']) == ['A', 'B', 'C']
+    assert stub_server.hits == {'/a.png': 1, '/a2.png': 1, '/b.png': 2, '/c.png': 1}
+
+    # Riprese a catena: il conteggio non cresce se non si rifà nulla
+    covers.main(args + ['--resume'])
+    third = load_json(output / covers.REPORT_NAME)
+    assert third['coversGenerated'] == 3
+    assert third['recovered'] == 0
+    assert third['resumedFrom'] == second['generatedAt']
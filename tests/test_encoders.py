@@ -0,0 +1,34 @@
+import random
+
+from PIL import Image
+
+from encoders import GATE_SAMPLE, TierGate, encode_gated
+
+
+def flat(color):
+    return Image.new('RGBA', (64, 64), color)
+
+
+def noisy(seed):
+    rng = random.Random(seed)
+    return Image.frombytes('RGBA', (64, 64), bytes(rng.randrange(256) for _ in range(64 * 64 * 4)))
+
+
+def test_gate_checks_every_image_after_a_passing_sample():
+    gate = TierGate()
+    for i in range(GATE_SAMPLE):
+        tier, _, _, ok = encode_gated(flat((i * 20, 40, 80, 255)), 'png8', gate=gate)
+        assert (tier, ok) == ('png8', True)
+    # Un'immagine che png8 non regge dopo un campione tutto accettato: si misura comunque e scende al fallback
+    tier, _, _, ok = encode_gated(noisy(1), 'png8', gate=gate)
+    assert (tier, ok) == ('png-optimize', True)
+    assert gate.results['png8'] == [GATE_SAMPLE + 1, GATE_SAMPLE]
+
+
+def test_gate_skips_tier_rejected_on_whole_sample():
+    gate = TierGate()
+    for i in range(GATE_SAMPLE):
+        assert encode_gated(noisy(i), 'png8', gate=gate)[0] == 'png-optimize'
+    assert gate.rejected('png8')
+    assert encode_gated(flat((10, 20, 30, 255)), 'png8', gate=gate)[0] == 'png-optimize'
+    assert gate.results['png8'] == [GATE_SAMPLE, 0]
@@ -0,0 +1,157 @@
+import itertools
+from email.utils import format_datetime
+from datetime import datetime, timezone
+
+import pytest
+
+import fetch_scheduler
+from fetch_scheduler import FetchScheduler, HostState, backoff_delay, retry_after_seconds
+from http_cache import HTTPCache
+
+
+class LowRng:
+    """rng di prova: uniform restituisce sempre l'estremo inferiore (ritentativi senza attesa)."""
+
+    def uniform(self, a, b):
+        return a
+
+
+class HighRng:
+    def uniform(self, a, b):
+        return b
+
+
+def host_at(clock, **limits):
+    """HostState con il bucket pieno all'istante clock (orologio finto: ready_in riceve sempre now)."""
+    host = HostState(**limits)
+    host.updated = clock
+    return host
+
+# ==========================================
+# Token bucket
+# ==========================================
+
+def test_token_bucket_burst_then_rate():
+    host = host_at(100.0, rate=2.0, burst=2, concurrency=10)
+    for _ in range(2):
+        assert host.ready_in(100.0) == 0
+        host.take()
+    assert host.ready_in(100.0) == pytest.approx(0.5)
+    assert host.ready_in(100.25) == pytest.approx(0.25)
+    assert host.ready_in(100.5) == pytest.approx(0.0)
+    # Il bucket non supera mai il burst, anche dopo molto tempo
+    assert host.ready_in(1000.0) == 0
+    assert host.tokens == 2
+
+
+def test_concurrency_limit():
+    host = host_at(0.0, rate=100.0, burst=10, concurrency=2)
+    host.take()
+    host.take()
+    assert host.ready_in(0.0) is None
+    host.active -= 1
+    assert host.ready_in(0.0) == 0
+
+
+def test_throttle_halves_rate_once_per_episode():
+    host = host_at(0.0, rate=8.0, burst=4, concurrency=4)
+    host.throttle(5.0, now=10.0)
+    assert host.rate == 4.0
+    assert host.tokens == 0.0
+    assert host.ready_in(10.0) == pytest.approx(5.0)
+    # 429 di una richiesta già in volo durante la sospensione: il ritmo non scende di nuovo
+    host.throttle(2.0, now=11.0)
+    assert host.rate == 4.0
+    assert host.blocked_until == 15.0
+    assert host.throttled == 2
+    # Episodi successivi: il ritmo scende fino a un ottavo del massimo, poi recover lo riporta su
+    for now in (20.0, 30.0, 40.0, 50.0):
+        host.throttle(1.0, now)
+    assert host.rate == 1.0
+    for _ in range(20):
+        host.recover()
+    assert host.rate == 8.0
+
+# ==========================================
+# Retry-After e backoff
+# ==========================================
+
+def test_retry_after_delta_seconds():
+    assert retry_after_seconds({'Retry-After': '120'}) == 120.0
+    assert retry_after_seconds({'Retry-After': ' 0 '}) == 0.0
+    assert retry_after_seconds({'Retry-After': '99999'}) == fetch_scheduler.RETRY_AFTER_MAX
+
+
+def test_retry_after_http_date():
+    now = datetime(2024, 3, 1, 12, 0, 0, tzinfo=timezone.utc).timestamp()
+    later = format_datetime(datetime(2024, 3, 1, 12, 0, 30, tzinfo=timezone.utc), usegmt=True)
+    earlier = format_datetime(datetime(2024, 3, 1, 11, 0, 0, tzinfo=timezone.utc), usegmt=True)
+    assert retry_after_seconds({'Retry-After': later}, now=now) == pytest.approx(30.0)
+    assert retry_after_seconds({'Retry-After': earlier}, now=now) == 0.0
+
+
+def test_retry_after_missing_or_invalid():
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds({}) is None
+    assert retry_after_seconds({'Retry-After': 'domani'}) is None
+
+
+def test_backoff_delay_bounds():
+    assert backoff_delay(3, base=1.0, cap=60.0, rng=HighRng()) == 8.0
+    assert backoff_delay(10, base=1.0, cap=60.0, rng=HighRng()) == 60.0
+    assert backoff_delay(3, rng=LowRng()) == 0.0
+
+# ==========================================
+# Scheduler
+# ==========================================
+
+def test_scheduler_throttles_host_on_429(tmp_path, stub_server):
+    stub_server.routes = {
+        '/a.png': [(429, {'Retry-After': '0'}, b''), (200, {}, b'a')],
+        '/b.png': [(503, {}, b''), (200, {}, b'b')],
+        '/c.png': [(404, {}, b'')],
+    }
+    host = f"127.0.0.1:{stub_server.server.server_port}"
+    scheduler = FetchScheduler(HTTPCache(str(tmp_path)).fetch, max_workers=1, rng=LowRng(),
+                               host_limits={host: {'rate': 50.0, 'burst': 1, 'concurrency': 1}})
+    results = {url.rsplit('/', 1)[1]: (data, error) for url, data, error in
+               scheduler.run(stub_server.url(p) for p in ('/a.png', '/b.png', '/c.png'))}
+
+    assert results['a.png'] == (b'a', None)
+    assert results['b.png'] == (b'b', None)
+    assert str(results['c.png'][1]) == 'HTTP 404'
+    assert scheduler.stats == {'requests': 5, 'retries': 2, 'throttled': 1, 'failed': 1}
+    assert scheduler.hosts[host].throttled == 1
+    assert scheduler.hosts[host].rate < 50.0
+    assert stub_server.hits == {'/a.png': 2, '/b.png': 2, '/c.png': 1}
+
+
+def test_scheduler_bounds_pending_urls():
+    hosts = [f"h{i}.test" for i in range(5)]
+    scheduler = FetchScheduler(lambda url: url.encode(), max_workers=2, max_pending=4,
+                               host_limits={h: {'rate': 1000.0, 'burst': 1000, 'concurrency': 2} for h in hosts})
+    read = 0
+
+    def urls():
+        nonlocal read
+        for i in range(50):
+            read += 1
+            yield f"http://{hosts[i % 5]}/{i}.png"
+
+    received = 0
+    ahead = 0
+    for url, data, error in scheduler.run(urls()):
+        received += 1
+        assert error is None and data == url.encode()
+        ahead = max(ahead, read - received)
+    assert received == 50
+    assert ahead <= 4
+
+
+def test_scheduler_does_not_requeue_pending_url():
+    calls = []
+    scheduler = FetchScheduler(lambda url: calls.append(url) or b'x', max_workers=1, max_pending=8,
+                               host_limits={'h.test': {'rate': 1000.0, 'burst': 1000, 'concurrency': 1}})
+    urls = itertools.repeat('http://h.test/a.png', 3)
+    assert [url for url, _, _ in scheduler.run(urls)] == ['http://h.test/a.png']
+    assert calls == ['http://h.test/a.png']
@@ -0,0 +1,65 @@
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+import matchup_server
+from matchup_server import LeagueService, MatchupHandler, MatchupService
+
+
+@pytest.fixture
+def league(tmp_path, monkeypatch):
+    directory = tmp_path / 'league'
+    directory.mkdir()
+    for name, color in (('alpha', (200, 0, 0, 255)), ('beta', (0, 0, 200, 255)), ('center', (0, 200, 0, 255))):
+        Image.new('RGBA', (96, 96), color).save(directory / f"{name}.png")
+    (directory / 'gamma.svg').write_text('<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>')
+    (directory / 'alpha_vs_beta.png').write_bytes(b'')
+    conf = {'directory': str(directory), 'center_logo': 'center.png',
+            'presets': [{'name': 'default', 'width': 160, 'height': 90, 'center_size': 30}]}
+    monkeypatch.setattr(matchup_server, 'LEAGUES', {'test': conf})
+    return directory
+
+
+@pytest.fixture
+def server(league, tmp_path, monkeypatch):
+    monkeypatch.setattr(MatchupHandler, 'service', MatchupService(str(tmp_path / 'cache')))
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), MatchupHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_team_file_uses_matchup_lookup(league, tmp_path):
+    service = LeagueService('test', str(tmp_path / 'cache'))
+    assert service.team_file('alpha') == 'alpha.png'
+    assert service.team_file('gamma') == 'gamma.svg'  # solo vettoriale, come in find_team_files
+    assert service.team_file('center') is None
+    assert service.team_file('alpha_vs_beta') is None
+    assert service.team_file('delta') is None
+
+
+def test_server_renders_and_caches(server):
+    with urllib.request.urlopen(f"{server}/matchup/test/alpha/beta.png") as response:
+        assert response.headers['Content-Type'] == 'image/png'
+        etag = response.headers['ETag']
+        assert response.read().startswith(b'\x89PNG')
+    request = urllib.request.Request(f"{server}/matchup/test/alpha/beta.png", headers={'If-None-Match': etag})
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(request)
+    assert e.value.code == 304
+    assert MatchupHandler.service.stats['rendered'] == 1
+    assert MatchupHandler.service.stats['not_modified'] == 1
+
+
+@pytest.mark.parametrize('path', ['/matchup/test/alpha/delta.png', '/matchup/test/alpha/alpha.png',
+                                  '/matchup/test/alpha/beta.webp', '/matchup/other/alpha/beta.png'])
+def test_server_not_found(server, path):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(server + path)
+    assert e.value.code == 404
@@ -0,0 +1,24 @@
+from schedule_output import build_shards
+
+DAY = "Saturday 08th Aug 2026 - Schedule Time UK GMT"
+
+
+def starts(events):
+    return [e['start'] for e in events]
+
+
+def test_events_past_midnight_move_to_next_day():
+    data = {DAY: {
+        'Soccer': [{'time': '15:30', 'event': 'a'}, {'time': '14:00', 'event': 'b'},
+                   {'time': '23:30', 'event': 'c'}, {'time': '00:15', 'event': 'd'}, {'time': '02:00', 'event': 'e'}],
+        'Tennis': [{'time': '18:30', 'event': 'f'}, {'time': '01:00', 'event': 'g'}, {'time': '18:30', 'event': 'h'}],
+    }}
+    shards, index = build_shards(data, 'hash')
+    assert starts(shards['2026-08-08']['events']) == [
+        '2026-08-08T15:30:00Z', '2026-08-08T14:00:00Z', '2026-08-08T23:30:00Z',
+        '2026-08-09T00:15:00Z', '2026-08-09T02:00:00Z',
+        # La categoria successiva riparte dal giorno del titolo; un ritorno all'indietro resta nel giorno
+        '2026-08-08T18:30:00Z', '2026-08-09T01:00:00Z', '2026-08-08T18:30:00Z',
+    ]
+    assert index['startTimes'] == sorted(index['startTimes'])
+    assert index['startIds'][-1] == '2026-08-08/4'